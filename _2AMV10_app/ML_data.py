@@ -3,15 +3,24 @@ import numpy as np
 from xgboost import XGBRegressor
 from sklearn.model_selection import train_test_split
 import calendar
-
-def load_ml_data():
-    # Load the datasets
-    df_links = pd.read_csv('data/links.csv')
-    df_movies = pd.read_csv('data/movies.csv')
-    df_metadata = pd.read_csv('data/movies_metadata.csv')
-
-    # Process metadata
-    df_metadata['release_date'] = pd.to_datetime(df_metadata['release_date'], errors='coerce')
+from .data import DATA_DIR
+from .genres import encode_genres, one_hot
+
+def load_ml_data(df_movies=None, df_links=None, data_dir=DATA_DIR, df_metadata=None):
+    # Reuse the frames already loaded by the shared data context
+    if df_movies is None or df_links is None:
+        from .context import get_data_context
+        ctx = get_data_context()
+        df_movies = ctx.movies[['movieId', 'title', 'genres', 'genre_mask']]
+        df_links = ctx.links
+
+    # The loaded links carry formatted 'tt0000000' ids, the model joins on the bare number
+    df_links = df_links.assign(imdbId=df_links['imdbId'].str[2:].astype(int))
+    if df_metadata is None:
+        df_metadata = pd.read_csv(data_dir / 'movies_metadata.csv')
+
+    # Process metadata (on a copy, the caller may share the raw frame)
+    df_metadata = df_metadata.assign(release_date=pd.to_datetime(df_metadata['release_date'], errors='coerce'))
     df_metadata = df_metadata.dropna(subset=['genres', 'release_date', 'revenue'])
     df_metadata['release_month'] = df_metadata['release_date'].dt.month
     df_metadata['release_year'] = df_metadata['release_date'].dt.year
@@ -37,12 +46,12 @@ def load_ml_data():
                      'Documentary', 'Drama', 'Fantasy', 'Film-Noir', 'Horror', 'Musical',
                      'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western']
 
-    for genre in genre_options:
-        df_movies[f'genre_{genre}'] = df_movies['genres'].apply(lambda x: int(genre in x.split('|')))
-
-    # Prepare features for the model
+    # One-hot genre columns straight from the genre bitmasks
     genre_columns = [f'genre_{genre}' for genre in genre_options]
+    masks = df_movies['genre_mask'].to_numpy() if 'genre_mask' in df_movies else encode_genres(df_movies['genres'])
+    df_movies[genre_columns] = one_hot(masks, genre_options).astype(np.int64)
 
+    # Prepare features for the model
     df_model = df_movies.dropna(subset=genre_columns + ['budget', 'release_month', 'revenue'])
 
     X = df_model[genre_columns + ['budget', 'release_month']]
@@ -0,0 +1,170 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from .downsample import DEFAULT_MAX_POINTS, lttb
+from .genres import genre_rating_stats
+
+logger = logging.getLogger(__name__)
+
+# Time-series resolutions from finest to coarsest, as (name, numpy unit)
+RESOLUTIONS = [("Day", "D"), ("Week", "W"), ("Month", "M")]
+
+
+def _bucket_starts(days, unit):
+    # First day of the day, week (starting Monday) or month of every day
+    if unit == "D":
+        return days
+    if unit == "W":
+        # 1 January 1970 was a Thursday
+        return (days + 3) // 7 * 7 - 3
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+class ChartAggregates:
+    """
+    Precomputed tables behind the chart selector.
+
+    Every chart mode is a small table derived once from the per-movie and
+    per-day rating aggregates, so switching charts or selecting a movie
+    only looks rows up instead of regrouping the ratings.
+
+    Attributes:
+        avg_by_genre (DataFrame): genres and rating (mean), alphabetical.
+        count_by_genre (DataFrame): genres and count, most rated first.
+        by_year (DataFrame): year and rating (mean) over all ratings.
+        by_month (DataFrame): month_year (first day of the month) and rating (mean).
+    """
+
+    def __init__(self, avg_by_genre, count_by_genre, by_year, daily, first_timestamps):
+        self.avg_by_genre = avg_by_genre
+        self.count_by_genre = count_by_genre
+        self.by_year = by_year
+        self.daily = daily
+        self.first_timestamps = first_timestamps
+        # Rating sum and count per bucket at every resolution
+        self._series = {unit: self._bucket(unit) for _, unit in RESOLUTIONS}
+        self.by_month = self._frame("M", 0, len(self._series["M"][0]))
+
+    @classmethod
+    def build(cls, movies, aggregates):
+        """
+        Derives the chart tables.
+
+        Args:
+            movies (DataFrame): Movies with movieId and genre_mask.
+            aggregates (RatingAggregates): Per-movie and per-day rating totals.
+        """
+        start = time.perf_counter()
+        genre_stats = genre_rating_stats(movies, aggregates)
+
+        # Yearly means weight every day by its number of ratings
+        daily = aggregates.daily
+        years = daily.days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970
+        by_year = (
+            pd.DataFrame({"year": years, "rating_sum": daily.rating_sum, "rating_count": daily.rating_count})
+            .groupby("year")[["rating_sum", "rating_count"]]
+            .sum()
+        )
+        by_year = pd.DataFrame({
+            "year": by_year.index.to_numpy(),
+            "rating": (by_year["rating_sum"] / by_year["rating_count"]).to_numpy(),
+        })
+
+        chart_aggregates = cls(
+            genre_stats[["genres", "rating"]],
+            genre_stats[["genres", "count"]].sort_values("count", ascending=False),
+            by_year,
+            daily,
+            pd.Series(aggregates.first_timestamp, index=aggregates.movie_ids),
+        )
+        logger.debug(f"Built chart aggregates in {time.perf_counter() - start:.4f}s")
+        return chart_aggregates
+
+    def _bucket(self, unit):
+        starts = _bucket_starts(self.daily.days, unit)
+        buckets, codes = np.unique(starts, return_inverse=True)
+        return (
+            buckets,
+            np.bincount(codes, weights=self.daily.rating_sum, minlength=len(buckets)),
+            np.bincount(codes, weights=self.daily.rating_count, minlength=len(buckets)),
+        )
+
+    def _frame(self, unit, start, end):
+        # month_year (first day of the bucket) and mean rating of buckets start:end
+        buckets, sums, counts = self._series[unit]
+        return pd.DataFrame({
+            "month_year": buckets[start:end].astype("datetime64[D]").astype("datetime64[ns]"),
+            "rating": sums[start:end] / np.maximum(counts[start:end], 1),
+        })
+
+    def rating_series(self, x_start=None, x_end=None, max_points=DEFAULT_MAX_POINTS):
+        """
+        Average rating over time, detailed for the visible x-range.
+
+        The visible range is served at the finest resolution (day, week or
+        month) that fits in max_points buckets; the rest of the time axis,
+        which stays visible in the range slider, at month resolution. Any
+        part still longer than max_points is downsampled with LTTB, so the
+        payload stays bounded however long the rating history is.
+
+        Args:
+            x_start, x_end: Visible x-range (anything pd.Timestamp accepts),
+                the full history when None.
+            max_points (int): Maximum points per part.
+
+        Returns:
+            tuple: DataFrame with month_year and rating, and the name of
+            the resolution of the visible range.
+        """
+        months = self._series["M"][0]
+        if x_start is None or x_end is None or len(months) == 0:
+            return self._limit(self.by_month, max_points), "Month"
+
+        # Visible range as days since 1970
+        start_day, end_day = (
+            int(pd.Timestamp(x).to_datetime64().astype("datetime64[D]").astype(np.int64)) for x in (x_start, x_end)
+        )
+        # Finest resolution whose buckets in the visible range fit; months otherwise
+        for name, unit in RESOLUTIONS:
+            buckets = self._series[unit][0]
+            lo = max(int(np.searchsorted(buckets, start_day, side="right")) - 1, 0)
+            hi = int(np.searchsorted(buckets, end_day, side="right"))
+            if hi - lo <= max_points:
+                break
+        visible = self._limit(self._frame(unit, lo, hi), max_points)
+
+        # Whole months before and after the visible buckets
+        first_day, last_day = (buckets[lo], buckets[hi - 1]) if hi > lo else (start_day, end_day)
+        before = self._frame("M", 0, np.searchsorted(months, first_day))
+        after = self._frame("M", np.searchsorted(months, last_day, side="right"), len(months))
+        series = pd.concat(
+            [self._limit(before, max_points // 2), visible, self._limit(after, max_points // 2)],
+            ignore_index=True,
+        )
+        return series, name
+
+    @staticmethod
+    def _limit(frame, max_points):
+        if len(frame) <= max_points:
+            return frame
+        return frame.iloc[lttb(frame["month_year"].to_numpy(), frame["rating"].to_numpy(), max_points)].reset_index(drop=True)
+
+    @property
+    def nbytes(self):
+        tables = (self.avg_by_genre, self.count_by_genre, self.by_year, self.by_month)
+        arrays = [a for series in self._series.values() for a in series]
+        return int(
+            sum(t.memory_usage(deep=True).sum() for t in tables)
+            + sum(a.nbytes for a in arrays)
+            + self.first_timestamps.nbytes
+        )
+
+    def first_rating(self, movie_id):
+        """
+        Timestamp of the first rating of a movie, None if it has no ratings.
+        """
+        timestamp = self.first_timestamps.get(movie_id)
+        return None if timestamp is None else pd.to_datetime(int(timestamp), unit="s")
@@ -0,0 +1,18 @@
+// Genre-trend visibility, toggled in the browser (see genre_callbacks.register_genre_callbacks)
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    genre_trends: {
+        // Shows the traces of the selected movie's genres, or all of them when
+        // no movie is selected; only the visible flags change
+        showGenres: function (selectedGenres, figure) {
+            if (!figure) {
+                return window.dash_clientside.no_update;
+            }
+            return Object.assign({}, figure, {
+                data: figure.data.map((trace) => Object.assign({}, trace, {
+                    visible: !selectedGenres || selectedGenres.includes(trace.name)
+                }))
+            });
+        }
+    }
+});
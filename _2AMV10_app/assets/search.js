@@ -0,0 +1,61 @@
+// Client-side title search for the movie dropdown (see movie_callbacks.register_movie_callbacks).
+// A linear scan that ranks like search.TitleSearchIndex, without its typo correction and with
+// toLowerCase() in place of casefold(); the differences are listed in the README.
+
+// Number of options shown, as search.DEFAULT_LIMIT
+const SEARCH_LIMIT = 10;
+
+// Normalized titles per title index, computed once per index shipped by the server
+const normalizedTitles = new WeakMap();
+
+// Same folding as search.normalize_title: no accents, lower case, runs of
+// punctuation and whitespace turned into a single space
+function normalizeTitle(text) {
+    return text
+        .normalize("NFKD")
+        .replace(/\p{M}/gu, "")
+        .toLowerCase()
+        .replace(/[^\p{L}\p{N}]+/gu, " ")
+        .trim();
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    search: {
+        // Top matches of the typed text: title prefixes first, then titles with a
+        // word starting with it, each in the index order (most rated first)
+        filterTitles: function (searchValue, currentValue, index) {
+            if (!index) {
+                return window.dash_clientside.no_update;
+            }
+            let titles = normalizedTitles.get(index);
+            if (!titles) {
+                titles = index.labels.map((label) => " " + normalizeTitle(label));
+                normalizedTitles.set(index, titles);
+            }
+
+            const options = [];
+            const query = searchValue ? normalizeTitle(searchValue) : "";
+            if (query) {
+                const prefix = " " + query;
+                const wordMatches = [];
+                for (let i = 0; i < titles.length && options.length < SEARCH_LIMIT; i++) {
+                    if (titles[i].startsWith(prefix)) {
+                        options.push({label: index.labels[i], value: index.values[i]});
+                    } else if (wordMatches.length < SEARCH_LIMIT && titles[i].includes(prefix)) {
+                        wordMatches.push({label: index.labels[i], value: index.values[i]});
+                    }
+                }
+                options.push(...wordMatches.slice(0, SEARCH_LIMIT - options.length));
+            }
+
+            // Ensure current selection is preserved
+            if (currentValue && options.every((option) => option.value !== currentValue)) {
+                const i = index.values.indexOf(currentValue);
+                if (i >= 0) {
+                    options.unshift({label: index.labels[i], value: currentValue});
+                }
+            }
+            return options;
+        }
+    }
+});
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the shape of the cached frames changes so old caches are rebuilt
+CACHE_VERSION = 5
+
+# Number of bytes read from the head and tail of each source file for the fingerprint
+_HASH_BLOCK = 64 * 1024
+
+
+def fingerprint_sources(data_dir, file_names, extra=None):
+    """
+    Computes a fingerprint of the source CSV files.
+
+    The fingerprint covers the name, size and modification time of every file
+    plus a hash of its first and last 64 KiB, so it changes when a file is
+    replaced or edited without reading the whole (possibly multi-GB) file.
+
+    Args:
+        data_dir (Path): Directory holding the source files.
+        file_names (list[str]): Names of the files that feed the cache.
+        extra (dict): Optional loader settings that also invalidate the cache.
+
+    Returns:
+        str: Hex digest identifying this exact set of sources.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}".encode())
+    for name in sorted(file_names):
+        path = Path(data_dir) / name
+        if not path.exists():
+            digest.update(f"{name}:missing".encode())
+            continue
+        stat = path.stat()
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(path, "rb") as f:
+            digest.update(f.read(_HASH_BLOCK))
+            if stat.st_size > _HASH_BLOCK:
+                f.seek(max(stat.st_size - _HASH_BLOCK, _HASH_BLOCK))
+                digest.update(f.read())
+    if extra:
+        digest.update(json.dumps(extra, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _read_frame(path):
+    frame = pd.read_parquet(path)
+    # Parquet does not record the string storage, restore the Arrow-backed strings
+    python_strings = [c for c in frame.columns if frame[c].dtype == pd.StringDtype("python")]
+    if python_strings:
+        frame = frame.astype({c: pd.StringDtype("pyarrow") for c in python_strings})
+    return frame
+
+
+def load_cached_frames(cache_dir, fingerprint):
+    """
+    Loads the cached frames if the cache was built from the same sources.
+
+    Returns:
+        dict[str, DataFrame] | None: The frames by name, or None on a cache miss.
+    """
+    manifest_path = Path(cache_dir) / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("fingerprint") != fingerprint:
+            logger.info("Data cache is stale, rebuilding")
+            return None
+        return {
+            name: _read_frame(Path(cache_dir) / f"{name}.parquet")
+            for name in manifest["frames"]
+        }
+    except Exception as e:
+        # A broken cache should never stop the app from starting
+        logger.warning(f"Could not read data cache: {e}")
+        return None
+
+
+def save_cached_frames(cache_dir, fingerprint, frames):
+    """
+    Writes the frames to the cache as Parquet files.
+
+    The files are written to a temporary directory first and then moved into
+    place, so a crash halfway through never leaves a half-written cache behind.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{cache_dir.name}-", dir=cache_dir.parent))
+    try:
+        for name, frame in frames.items():
+            frame.reset_index(drop=True).to_parquet(tmp_dir / f"{name}.parquet", index=False)
+        manifest = {"fingerprint": fingerprint, "frames": list(frames)}
+        (tmp_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+        if cache_dir.exists():
+            shutil.rmtree(cache_dir)
+        os.replace(tmp_dir, cache_dir)
+    except Exception as e:
+        logger.warning(f"Could not write data cache: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@contextmanager
+def staged_directory(directory):
+    """
+    Yields a temporary sibling of directory to write files into; when the
+    block succeeds the sibling replaces directory in one rename.
+
+    Files of a published directory are never rewritten in place: processes
+    that have them memory-mapped keep reading the old, intact files, and
+    other processes only ever see a complete directory. If another process
+    publishes the directory first, its files are kept and these discarded.
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent))
+    try:
+        yield tmp_dir
+        _publish_directory(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _publish_directory(tmp_dir, directory):
+    try:
+        os.replace(tmp_dir, directory)
+        return
+    except OSError:
+        pass
+    # Move the existing directory aside instead of deleting files in it
+    # that may be memory-mapped, then try once more
+    stale = Path(tempfile.mkdtemp(prefix=f".{directory.name}-stale-", dir=directory.parent))
+    try:
+        os.replace(directory, stale / directory.name)
+    except FileNotFoundError:
+        pass
+    try:
+        os.replace(tmp_dir, directory)
+    except OSError:
+        # Another process published the directory in the meantime
+        logger.debug(f"Keeping {directory} published by another process")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.rmtree(stale, ignore_errors=True)
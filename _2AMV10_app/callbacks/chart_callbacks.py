@@ -1,183 +1,246 @@
+from dash import Patch, callback_context, no_update
 from dash.dependencies import Input, Output, State
 import plotly.express as px
-import pandas as pd
+from _2AMV10_app.context import get_data_context
+from _2AMV10_app.figures import bar_colors, vline, with_bar_colors, with_vlines
+
+
+def _avg_figure(aggregates):
+    # Create bar chart for average ratings
+    fig = px.bar(
+        aggregates.avg_by_genre,
+        x='genres',
+        y='rating',
+        title='Average Rating by Genre',
+        labels={'genres': 'Genre', 'rating': 'Average Rating'},
+        height=400
+    )
+    fig.update_traces(marker_color=bar_colors(aggregates.avg_by_genre['genres'], []))
+
+    # Update layout for better readability
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        xaxis_title="Genre",
+        yaxis_title="Average Rating",
+        showlegend=False
+    )
+    return fig
+
+
+def _counts_figure(aggregates):
+    # Create bar chart for most rated genres
+    fig = px.bar(
+        aggregates.count_by_genre,
+        x='genres',
+        y='count',
+        title='Number of Ratings by Genre',
+        labels={'genres': 'Genre', 'count': 'Number of Ratings'},
+        height=400
+    )
+    fig.update_traces(marker_color=bar_colors(aggregates.count_by_genre['genres'], []))
+
+    # Update layout for better readability
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        xaxis_title="Genre",
+        yaxis_title="Number of Ratings",
+        showlegend=False
+    )
+    return fig
+
+
+def _years_figure(aggregates):
+    # Create line chart for ratings by year
+    fig = px.line(
+        aggregates.by_year,
+        x='year',
+        y='rating',
+        title='Average Rating by Year',
+        labels={'year': 'Year', 'rating': 'Average Rating'},
+        height=400
+    )
+
+    # Update layout for better readability
+    fig.update_layout(
+        xaxis_title="Year",
+        yaxis_title="Average Rating",
+        showlegend=False,
+        hovermode='x unified'
+    )
+
+    # Update x-axis to show appropriate time format
+    fig.update_xaxes(
+        rangeslider_visible=True,
+        rangeselector=dict(
+            buttons=list([
+                dict(count=1, label="1y", step="year", stepmode="backward"),
+                dict(count=2, label="2y", step="year", stepmode="backward"),
+                dict(count=5, label="5y", step="year", stepmode="backward"),
+                dict(step="all")
+            ])
+        )
+    )
+    return fig
+
+
+def _months_figure(aggregates):
+    # Create line chart for ratings by month (x-axis is datetime), bounded in points
+    monthly_ratings, _ = aggregates.rating_series()
+    fig = px.line(
+        monthly_ratings,
+        x='month_year',
+        y='rating',
+        title='Average Rating by Month',
+        labels={'month_year': 'Month', 'rating': 'Average Rating'},
+        height=400
+    )
+
+    # Update layout for better readability
+    fig.update_layout(
+        xaxis_title="Month",
+        yaxis_title="Average Rating",
+        showlegend=False,
+        hovermode='x unified',
+        uirevision='months'  # Keep the zoom when the detail is refreshed
+    )
+
+    # Update x-axis to show appropriate time format
+    fig.update_xaxes(
+        rangeslider_visible=True,
+        rangeselector=dict(
+            buttons=list([
+                dict(count=3, label="3m", step="month", stepmode="backward"),
+                dict(count=6, label="6m", step="month", stepmode="backward"),
+                dict(count=1, label="1y", step="year", stepmode="backward"),
+                dict(step="all")
+            ])
+        )
+    )
+    return fig
+
+
+# Base figure builder of every chart-selector value
+CHART_FIGURES = {
+    'avg': _avg_figure,
+    'counts': _counts_figure,
+    'years': _years_figure,
+    'months': _months_figure,
+}
+
+
+def _visible_range(relayout_data):
+    """
+    Visible x-range of a relayoutData event: (start, end), (None, None)
+    after an autorange, or None if the x-axis did not change.
+    """
+    if not relayout_data:
+        return None
+    if relayout_data.get('xaxis.autorange'):
+        return None, None
+    if 'xaxis.range[0]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'][:2])
+    return None
+
+
+def _with_rating_series(figure, series, resolution):
+    """
+    Copy of the cached months figure showing a rating_series() result.
+    """
+    trace = {**figure["data"][0], "x": series['month_year'].to_numpy(), "y": series['rating'].to_numpy()}
+    xaxis = figure["layout"]["xaxis"]
+    layout = {**figure["layout"], "xaxis": {**xaxis, "title": {**xaxis.get("title", {}), "text": resolution}}}
+    return {**figure, "data": [trace] + list(figure["data"][1:]), "layout": layout}
+
+
+def register_chart_callbacks(app):
+    @app.callback(
+        Output('months-range', 'data'),
+        Input('selected-chart', 'relayoutData'),
+        State('chart-selector', 'value'),
+        prevent_initial_call=True
+    )
+    def remember_months_range(relayout_data, selected_chart):
+        # Kept across chart switches; uirevision restores the zoom of the months
+        # chart, so its data has to match the restored range
+        visible_range = _visible_range(relayout_data)
+        if (selected_chart in CHART_FIGURES and selected_chart != 'months') or visible_range is None:
+            return no_update
+        # None after an autorange, the chart is then drawn in full again
+        return None if None in visible_range else list(visible_range)
+
 
-def register_chart_callbacks(app, movies, ratings):
     @app.callback(
         Output('selected-chart', 'figure'),
         [Input('chart-selector', 'value'),
-         Input('movie-dropdown', 'value')]
+         Input('movie-dropdown', 'value'),
+         Input('selected-chart', 'relayoutData'),
+         Input('dataset-selector', 'value')],
+        State('months-range', 'data')
     )
-    def update_chart(selected_chart, selected_movie):
-        # Work on a copy to avoid mutating the original DataFrame
-        movies_copy = movies.copy()
-        # Only split if genres are strings
-        movies_copy['genres'] = movies_copy['genres'].apply(lambda x: x.split('|') if isinstance(x, str) else x)
-        movies_exploded = movies_copy.explode('genres')
-        
-        # Merge with ratings
-        movie_ratings = pd.merge(movies_exploded, ratings, on='movieId')
-        
+    def update_chart(selected_chart, selected_movie, relayout_data, dataset, months_range):
+        ctx = get_data_context(dataset)
+        catalog = ctx.catalog
+        # Every chart is a lookup into tables precomputed from the rating aggregates
+        aggregates = ctx.chart_aggregates
+        if selected_chart not in CHART_FIGURES:
+            selected_chart = 'months'
+
+        # Base figures are built once; the selection is applied on top of them
+        figure = ctx.figures.get(selected_chart, aggregates, CHART_FIGURES[selected_chart])
+        # When only the movie changed the browser already shows this chart,
+        # so only the highlight is sent as a partial update
+        highlight_only = callback_context.triggered_id == 'movie-dropdown'
+
+        if callback_context.triggered_id == 'selected-chart':
+            # Zooming or panning the months chart fetches the detail of the visible range
+            visible_range = _visible_range(relayout_data)
+            if selected_chart != 'months' or visible_range is None:
+                return no_update
+            series, resolution = aggregates.rating_series(*visible_range)
+            patch = Patch()
+            patch['data'][0]['x'] = series['month_year'].to_numpy()
+            patch['data'][0]['y'] = series['rating'].to_numpy()
+            patch['layout']['xaxis']['title']['text'] = resolution
+            return patch
+
         # Get selected movie info if a movie is selected
-        selected_movie_info = None
+        selected_pos = catalog.find(selected_movie)
         selected_genres = []
         selected_year = None
-        selected_month = None
-        if selected_movie:
-            movie_row = movies[movies['imdbId'] == selected_movie]
-            if not movie_row.empty:
-                selected_movie_info = movie_row.iloc[0]
-                selected_genres = selected_movie_info['genres'].split('|') if isinstance(selected_movie_info['genres'], str) else selected_movie_info['genres']
-                movie_ratings_row = ratings[ratings['movieId'] == selected_movie_info['movieId']]
-                if not movie_ratings_row.empty:
-                    selected_year = pd.to_datetime(movie_ratings_row['timestamp'].min(), unit='s').year
-                    selected_month = pd.to_datetime(movie_ratings_row['timestamp'].min(), unit='s').strftime('%Y-%m')
-        
-        if selected_chart == 'avg':
-            # Calculate average rating per genre
-            genre_ratings = movie_ratings.groupby('genres')['rating'].mean().reset_index()
-            
-            # Highlight selected movie's genres with a color array
-            bar_colors = []
-            for genre in genre_ratings['genres']:
-                if genre in selected_genres:
-                    bar_colors.append('#FF0000')  # Red for selected genres
-                else:
-                    bar_colors.append('#636EFA')  # Default Plotly blue
-            
-            # Create bar chart for average ratings
-            fig = px.bar(
-                genre_ratings,
-                x='genres',
-                y='rating',
-                title='Average Rating by Genre',
-                labels={'genres': 'Genre', 'rating': 'Average Rating'},
-                height=400
-            )
-            fig.update_traces(marker_color=bar_colors)
-            
-            # Update layout for better readability
-            fig.update_layout(
-                xaxis_tickangle=-45,
-                xaxis_title="Genre",
-                yaxis_title="Average Rating",
-                showlegend=False
-            )
-            
-        elif selected_chart == 'counts':
-            # Calculate most rated genres
-            genre_counts = movie_ratings.groupby('genres').size().reset_index(name='count')
-            genre_counts = genre_counts.sort_values('count', ascending=False)
-            
+        if selected_pos is not None:
+            selected_genres = catalog.genres(selected_pos)
+            first_rating = aggregates.first_rating(catalog.movie_id(selected_pos))
+            if first_rating is not None:
+                selected_year = first_rating.year
+
+        if selected_chart in ('avg', 'counts'):
             # Highlight selected movie's genres with a color array
-            bar_colors = []
-            for genre in genre_counts['genres']:
-                if genre in selected_genres:
-                    bar_colors.append('#FF0000')  # Red for selected genres
-                else:
-                    bar_colors.append('#636EFA')  # Default Plotly blue
-            
-            # Create bar chart for most rated genres
-            fig = px.bar(
-                genre_counts,
-                x='genres',
-                y='count',
-                title='Number of Ratings by Genre',
-                labels={'genres': 'Genre', 'count': 'Number of Ratings'},
-                height=400
-            )
-            fig.update_traces(marker_color=bar_colors)
-            
-            # Update layout for better readability
-            fig.update_layout(
-                xaxis_tickangle=-45,
-                xaxis_title="Genre",
-                yaxis_title="Number of Ratings",
-                showlegend=False
-            )
-            
-        elif selected_chart == 'years':
-            # Convert timestamp to datetime and extract year
-            ratings['datetime'] = pd.to_datetime(ratings['timestamp'], unit='s')
-            ratings['year'] = ratings['datetime'].dt.year
-            yearly_ratings = ratings.groupby('year')['rating'].mean().reset_index()
-            
-            # Create line chart for ratings by year
-            fig = px.line(
-                yearly_ratings,
-                x='year',
-                y='rating',
-                title='Average Rating by Year',
-                labels={'year': 'Year', 'rating': 'Average Rating'},
-                height=400
-            )
-            
-            # Update layout for better readability
-            fig.update_layout(
-                xaxis_title="Year",
-                yaxis_title="Average Rating",
-                showlegend=False,
-                hovermode='x unified'
-            )
-            
-            # Update x-axis to show appropriate time format
-            fig.update_xaxes(
-                rangeslider_visible=True,
-                rangeselector=dict(
-                    buttons=list([
-                        dict(count=1, label="1y", step="year", stepmode="backward"),
-                        dict(count=2, label="2y", step="year", stepmode="backward"),
-                        dict(count=5, label="5y", step="year", stepmode="backward"),
-                        dict(step="all")
-                    ])
-                )
-            )
-            
+            table = aggregates.avg_by_genre if selected_chart == 'avg' else aggregates.count_by_genre
+            colors = bar_colors(table['genres'], selected_genres)
+            if highlight_only:
+                patch = Patch()
+                patch['data'][0]['marker']['color'] = colors
+                return patch
+            return with_bar_colors(figure, colors)
+
+        if selected_chart == 'years':
             # Add vertical line for selected movie's year
-            if selected_movie_info is not None and selected_year is not None:
-                fig.add_vline(
-                    x=selected_year,
-                    line_dash="dash",
-                    line_color="red",
-                    annotation_text=f"Selected Movie ({selected_movie_info['title']})",
-                    annotation_position="top right"
-                )
-            
-        else:  # months
-            # Convert timestamp to datetime and extract month and year
-            ratings['datetime'] = pd.to_datetime(ratings['timestamp'], unit='s')
-            ratings['month_year'] = ratings['datetime'].dt.to_period('M').dt.to_timestamp()
-            monthly_ratings = ratings.groupby('month_year')['rating'].mean().reset_index()
-            
-            # Create line chart for ratings by month (x-axis is datetime)
-            fig = px.line(
-                monthly_ratings,
-                x='month_year',
-                y='rating',
-                title='Average Rating by Month',
-                labels={'month_year': 'Month', 'rating': 'Average Rating'},
-                height=400
-            )
-            
-            # Update layout for better readability
-            fig.update_layout(
-                xaxis_title="Month",
-                yaxis_title="Average Rating",
-                showlegend=False,
-                hovermode='x unified'
-            )
-            
-            # Update x-axis to show appropriate time format
-            fig.update_xaxes(
-                rangeslider_visible=True,
-                rangeselector=dict(
-                    buttons=list([
-                        dict(count=3, label="3m", step="month", stepmode="backward"),
-                        dict(count=6, label="6m", step="month", stepmode="backward"),
-                        dict(count=1, label="1y", step="year", stepmode="backward"),
-                        dict(step="all")
-                    ])
-                )
-            )
-            
-        return fig 
\ No newline at end of file
+            lines = []
+            if selected_year is not None:
+                lines.append(vline(selected_year, f"Selected Movie ({catalog.title(selected_pos)})"))
+            if highlight_only:
+                patch = Patch()
+                patch['layout']['shapes'] = [shape for shape, _ in lines]
+                patch['layout']['annotations'] = [annotation for _, annotation in lines]
+                return patch
+            return with_vlines(figure, lines)
+
+        # The months chart does not depend on the selected movie
+        if highlight_only:
+            return no_update
+        if months_range:
+            # Detail of the range the chart was last zoomed to
+            return _with_rating_series(figure, *aggregates.rating_series(*months_range))
+        return figure
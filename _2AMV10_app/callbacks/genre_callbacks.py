@@ -1,28 +1,43 @@
-from dash.dependencies import Input, Output, State
-from dash import callback_context
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash import no_update
+from _2AMV10_app.context import get_data_context
+from _2AMV10_app.views.genre_trends import genre_trends_figure
 
-def register_genre_callbacks(app, movies):
+def register_genre_callbacks(app):
     @app.callback(
         Output('genre-trends-chart', 'figure'),
+        [Input('dataset-selector', 'value')],
+        prevent_initial_call=True
+    )
+    def update_genre_trends(dataset):
+        # Redraw the trends of the newly selected dataset from its cached base figure;
+        # the movie selection is reset with it, so all genres are shown
+        ctx = get_data_context(dataset)
+        return ctx.figures.get('genre_trends', ctx.genre_trends, genre_trends_figure)
+
+    @app.callback(
+        Output('selected-genres', 'data'),
         [Input('movie-dropdown', 'value')],
-        [State('genre-trends-chart', 'figure')]
+        [State('dataset-selector', 'value')]
     )
-    def update_genre_visibility(selected_movie, current_figure):
+    def update_selected_genres(selected_movie, dataset):
+        # Only the genre list goes to the browser; the figure never leaves it
         if not selected_movie:
             # If no movie is selected, show all genres
-            for trace in current_figure['data']:
-                trace['visible'] = True
-            return current_figure
-            
+            return None
+
         # Get the selected movie's genres
-        movie_row = movies[movies['imdbId'] == selected_movie]
-        if movie_row.empty:
-            return current_figure
-            
-        selected_genres = movie_row.iloc[0]['genres'].split('|') if isinstance(movie_row.iloc[0]['genres'], str) else movie_row.iloc[0]['genres']
-        
-        # Update visibility of traces based on selected movie's genres
-        for trace in current_figure['data']:
-            trace['visible'] = trace['name'] in selected_genres
-            
-        return current_figure 
\ No newline at end of file
+        ctx = get_data_context(dataset)
+        pos = ctx.catalog.find(selected_movie)
+        if pos is None:
+            return no_update
+        return ctx.catalog.genres(pos)
+
+    # Update visibility of traces based on selected movie's genres (assets/genre_trends.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='genre_trends', function_name='showGenres'),
+        Output('genre-trends-chart', 'figure', allow_duplicate=True),
+        [Input('selected-genres', 'data')],
+        [State('genre-trends-chart', 'figure')],
+        prevent_initial_call=True
+    )
@@ -1,98 +1,192 @@
-from dash.dependencies import Input, Output
-from dash import html, dcc
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash import html, dcc, callback_context, get_relative_path
 import logging
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from _2AMV10_app.views.movieimage import fetch_movie_image
+from _2AMV10_app.context import get_data_context
+from _2AMV10_app.poster_images import POSTER_POLL_INTERVAL_MS, POSTER_TIMEOUT, get_poster_image_store, poster_path
+from _2AMV10_app.prefetch import get_poster_prefetcher
+from _2AMV10_app.ratings_index import RATING_VALUES
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def register_movie_callbacks(app, movies, ratings):
+
+def _rating_histogram_figure():
+    # Rating distribution chart without counts; the bars are filled in per movie
+    fig = px.bar(
+        x=RATING_VALUES,
+        y=[0] * len(RATING_VALUES),
+        title="Rating Distribution",
+        labels={"x": "", "y": "Count"},
+        height=200
+    )
+
+    fig.update_layout(
+        margin=dict(l=20, r=20, t=40, b=20),
+        showlegend=False,
+        xaxis=dict(tickmode='linear', tick0=0.5, dtick=0.5, title=None),
+        yaxis=dict(showgrid=False, title="Count"),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        title_x=0.5,  # Center the title
+        bargap=0  # Remove padding between bars
+    )
+
+    # Update bar width to fill the space
+    fig.update_traces(width=0.5)
+    return fig
+
+
+# Same for every movie and dataset, so built once
+_RATING_HISTOGRAM_FIGURE = _rating_histogram_figure().to_plotly_json()
+
+
+def _poster_message(text):
+    # Placeholder shown where the poster goes
+    return html.Div(text, style={"color": "#666", "padding": "20px 0", "textAlign": "center"})
+
+
+def _client_title_index(catalog):
+    # Selectable titles and their IMDb ids, most rated first, for filtering in the browser
+    order = np.argsort(-catalog.rating_counts, kind="stable")
+    imdb_ids = catalog.imdb_ids[order]
+    selectable = pd.notna(imdb_ids)
+    return {
+        "labels": catalog.titles[order][selectable].tolist(),
+        "values": imdb_ids[selectable].tolist(),
+    }
+
+
+def register_movie_callbacks(app, clientside_search=False):
+    if clientside_search:
+        # Ship the titles once per dataset; typing then filters them in the
+        # browser (assets/search.js) without a request per keystroke
+        @app.callback(
+            Output("title-index", "data"),
+            [Input("dataset-selector", "value")]
+        )
+        def update_title_index(dataset):
+            return _client_title_index(get_data_context(dataset).catalog)
+
+        app.clientside_callback(
+            ClientsideFunction(namespace="search", function_name="filterTitles"),
+            Output("movie-dropdown", "options"),
+            [Input("movie-dropdown", "search_value"), Input("movie-dropdown", "value")],
+            [State("title-index", "data")]
+        )
+    else:
+        _register_server_search(app)
+
+    _register_selection_callbacks(app)
+
+
+def _register_server_search(app):
     @app.callback(
         Output("movie-dropdown", "options"),
-        [Input("movie-dropdown", "search_value"), Input("movie-dropdown", "value")]
+        [Input("movie-dropdown", "search_value"), Input("movie-dropdown", "value")],
+        [State("dataset-selector", "value")]
     )
-    def update_dropdown_options(search_value, current_value):
+    def update_dropdown_options(search_value, current_value, dataset):
         logger.debug(f"Dropdown search triggered with value: {search_value}")
+        ctx = get_data_context(dataset)
+        catalog = ctx.catalog
 
         options = []
 
         if search_value:
-            # Filter movies by search
-            filtered_movies = movies[movies["title"].str.contains(search_value, case=False, na=False)].head(10)
+            # Best title matches from the prebuilt search index
             options = [
-                {"label": row["title"], "value": row["imdbId"]}
-                for _, row in filtered_movies.iterrows()
-                if pd.notna(row["imdbId"])
+                {"label": catalog.title(pos), "value": catalog.imdb_id(pos)}
+                for pos in ctx.title_search.search(search_value)
+                if pd.notna(catalog.imdb_id(pos))
             ]
+            # Fetch the posters of the suggestions before one is picked
+            get_poster_prefetcher().prefetch([opt["value"] for opt in options], channel="dropdown")
 
         # Ensure current selection is preserved
         if current_value and all(opt["value"] != current_value for opt in options):
-            # Try to get label from DataFrame
-            match = movies[movies["imdbId"] == current_value]
-            if not match.empty:
-                label = match.iloc[0]["title"]
-                options.insert(0, {"label": label, "value": current_value})
+            # Try to get label from the catalog
+            pos = ctx.catalog.find(current_value)
+            if pos is not None:
+                options.insert(0, {"label": ctx.catalog.title(pos), "value": current_value})
 
         return options
 
+
+def _register_selection_callbacks(app):
+    @app.callback(
+        Output("movie-dropdown", "value"),
+        [Input("dataset-selector", "value")],
+        prevent_initial_call=True
+    )
+    def reset_movie_selection(dataset):
+        # The selected movie belongs to the previous dataset
+        return None
+
+    @app.callback(
+        [Output("movie-poster", "children"),
+         Output("poster-poll", "disabled"),
+         Output("poster-poll", "n_intervals")],
+        [Input("movie-dropdown", "value"),
+         Input("poster-poll", "n_intervals")]
+    )
+    def update_movie_poster(imdb_id, n_intervals):
+        # The poster is downloaded in the background; until it is on disk the
+        # panel shows a placeholder and polls, so no request waits on OMDb
+        if not imdb_id:
+            return None, True, 0
+        new_selection = callback_context.triggered_id != "poster-poll"
+        path, error = get_poster_image_store().request(imdb_id, retry=new_selection)
+        n_intervals = 0 if new_selection else n_intervals
+
+        if path is not None:
+            logger.debug(f"Poster of {imdb_id} ready after {n_intervals} polls")
+            return html.Img(
+                # Thumbnail served and cached by the app itself (see poster_images)
+                src=get_relative_path(poster_path(imdb_id)),
+                style={"maxWidth": "300px", "height": "auto", "border": "2px solid black", "marginBottom": "10px"}
+            ), True, n_intervals
+        if error is None and n_intervals * POSTER_POLL_INTERVAL_MS < POSTER_TIMEOUT * 1000:
+            return _poster_message("Loading poster..."), False, n_intervals
+        return _poster_message(error or "Poster not available right now."), True, n_intervals
+
     @app.callback(
-        Output("movie-poster-container", "children"),
-        [Input("movie-dropdown", "value")]
+        [Output("movie-title", "children"),
+         Output("movie-details", "children")],
+        [Input("movie-dropdown", "value")],
+        [State("dataset-selector", "value")]
     )
-    def update_movie_poster(imdb_id):
+    def update_movie_details(imdb_id, dataset):
         logger.debug(f"Selected IMDb ID: {imdb_id}")
 
         if not imdb_id:
             return html.Div("Enter a movie title to see its poster.", 
                             style={"color": "red", "fontSize": "28px", 
-                                   "textAlign": "center", "fontWeight": "bold"})
-
-        poster_url = fetch_movie_image(imdb_id)
-        logger.debug(f"Poster URL: {poster_url}")
+                                   "textAlign": "center", "fontWeight": "bold"}), None
 
-        if poster_url.startswith("Error"):
+        # Everything but the poster is rendered right away from memory
+        ctx = get_data_context(dataset)
+        catalog = ctx.catalog
+        pos = catalog.find(imdb_id)
+        if pos is None:
             return html.Div([
                 html.H3("Error:", style={"color": "red"}),
-                html.P(poster_url)
-            ])
-
-        # Get the movie information from the movies DataFrame
-        movie_info = movies[movies["imdbId"] == imdb_id].iloc[0]
-        movie_title = movie_info["title"]
-        genres = movie_info["genres"]
-        if isinstance(genres, str):
-            genres = genres.split("|")
-        avg_rating = round(movie_info["average_rating"], 2)
-        rating_count = int(movie_info["rating_count"])
-        movie_id = movie_info["movieId"]
-
-        # Create rating distribution chart
-        movie_ratings = ratings[ratings["movieId"] == movie_id]
-        rating_counts = movie_ratings["rating"].value_counts().sort_index()
-        
-        fig = px.bar(
-            x=rating_counts.index,
-            y=rating_counts.values,
-            title="Rating Distribution",
-            labels={"x": "", "y": "Count"},
-            height=200
-        )
-        
-        fig.update_layout(
-            margin=dict(l=20, r=20, t=40, b=20),
-            showlegend=False,
-            xaxis=dict(tickmode='linear', tick0=0.5, dtick=0.5, title=None),
-            yaxis=dict(showgrid=False, title="Count"),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            title_x=0.5,  # Center the title
-            bargap=0  # Remove padding between bars
-        )
-        
-        # Update bar width to fill the space
-        fig.update_traces(width=0.5)
+                html.P(f"Movie {imdb_id} is not in the selected dataset.")
+            ]), None
+        movie_title = catalog.title(pos)
+        genres = catalog.genres(pos)
+        avg_rating = round(catalog.average_rating(pos), 2)
+        rating_count = catalog.rating_count(pos)
+
+        # Create rating distribution chart from the movie's row of the rating histograms
+        rating_counts = ctx.rating_histograms.distribution(pos)
+
+        # Fill the cached base chart with this movie's bars
+        base = _RATING_HISTOGRAM_FIGURE
+        trace = {**base["data"][0], "x": rating_counts.index.tolist(), "y": rating_counts.values.tolist()}
+        fig = {**base, "data": [trace]}
 
         # Define genre colors
         genre_colors = {
@@ -136,39 +230,34 @@ def register_movie_callbacks(app, movies, ratings):
         # Create IMDb link
         imdb_link = f"https://www.imdb.com/title/{imdb_id}/"
 
-        return html.Div([
-            html.H3(movie_title, style={"marginBottom": "10px", "fontWeight": "bold", "fontSize": "28px"}),
-            html.Img(
-                src=poster_url,
-                style={"maxWidth": "300px", "height": "auto", "border": "2px solid black", "marginBottom": "10px"}
-            ),
+        title = html.H3(movie_title, style={"marginBottom": "10px", "fontWeight": "bold", "fontSize": "28px"})
+        return title, html.Div([
+            html.Div([
+                html.Span("⭐ ", style={"color": "#FFD700", "fontSize": "20px"}),
+                html.Span(f"{avg_rating}/5.0" if rating_count else "No ratings yet",
+                          style={"fontSize": "16px", "fontWeight": "bold"})
+            ], style={"marginBottom": "5px"}),
+            html.Div([
+                html.Span("👥 ", style={"fontSize": "16px"}),
+                html.Span(f"{rating_count} ratings", style={"fontSize": "14px"})
+            ], style={"marginBottom": "10px"}),
+            html.Div(genre_tags, style={"display": "flex", "flexWrap": "wrap", "marginTop": "10px"}),
+            dcc.Graph(figure=fig, style={"height": "200px", "marginTop": "10px"}),
             html.Div([
-                html.Div([
-                    html.Span("⭐ ", style={"color": "#FFD700", "fontSize": "20px"}),
-                    html.Span(f"{avg_rating}/5.0", style={"fontSize": "16px", "fontWeight": "bold"})
-                ], style={"marginBottom": "5px"}),
-                html.Div([
-                    html.Span("👥 ", style={"fontSize": "16px"}),
-                    html.Span(f"{rating_count} ratings", style={"fontSize": "14px"})
-                ], style={"marginBottom": "10px"}),
-                html.Div(genre_tags, style={"display": "flex", "flexWrap": "wrap", "marginTop": "10px"}),
-                dcc.Graph(figure=fig, style={"height": "200px", "marginTop": "10px"}),
-                html.Div([
-                    html.A(
-                        "View on IMDb",
-                        href=imdb_link,
-                        target="_blank",
-                        style={
-                            "display": "inline-block",
-                            "marginTop": "15px",
-                            "padding": "8px 16px",
-                            "backgroundColor": "#F5C518",
-                            "color": "#000000",
-                            "textDecoration": "none",
-                            "borderRadius": "4px",
-                            "fontWeight": "bold"
-                        }
-                    )
-                ], style={"textAlign": "center", "marginTop": "10px"})
-            ], style={"textAlign": "center"})
+                html.A(
+                    "View on IMDb",
+                    href=imdb_link,
+                    target="_blank",
+                    style={
+                        "display": "inline-block",
+                        "marginTop": "15px",
+                        "padding": "8px 16px",
+                        "backgroundColor": "#F5C518",
+                        "color": "#000000",
+                        "textDecoration": "none",
+                        "borderRadius": "4px",
+                        "fontWeight": "bold"
+                    }
+                )
+            ], style={"textAlign": "center", "marginTop": "10px"})
         ], style={"textAlign": "center"}) 
\ No newline at end of file
@@ -1,108 +1,110 @@
 from dash.dependencies import Input, Output, State
-from dash import html, callback_context
+from dash import callback_context
 import math
+import numpy as np
+import pandas as pd
+from _2AMV10_app.context import get_data_context
+from _2AMV10_app.genres import decode_genres
+from _2AMV10_app.prefetch import get_poster_prefetcher
+from _2AMV10_app.top_rated import SORT_COLUMNS
 
-def register_top_rated_callbacks(app, movies):
+
+def _query(dataset, min_ratings, rating_range, sort_by, page_size):
+    # Dataset, filter and sort of the table; any change starts over at the first page
+    column, descending = "average_rating", True
+    if sort_by and sort_by[0]["column_id"] in SORT_COLUMNS:
+        column = sort_by[0]["column_id"]
+        descending = sort_by[0]["direction"] == "desc"
+    return {
+        "dataset": dataset,
+        "min_ratings": min_ratings or 0,
+        "rating_range": list(rating_range),
+        "sort_by": column,
+        "descending": descending,
+        "page_size": page_size,
+    }
+
+
+def _cursor(row, column):
+    # Keyset cursor of a row: its sort value and movieId as JSON values
+    value = row[column]
+    return [value.item() if isinstance(value, np.generic) else value, int(row["movieId"])]
+
+
+def _page_rows(movies, positions, first_rank):
+    # Table records of one page; genre labels are decoded once per distinct mask
+    page = movies.iloc[positions]
+    masks = page["genre_mask"].to_numpy()
+    labels = {mask: f"[{', '.join(decode_genres(mask))}]" for mask in np.unique(masks)}
+    return pd.DataFrame({
+        "rank": np.arange(first_rank + 1, first_rank + 1 + len(page)),
+        "title": page["title"].astype(str).to_numpy(),
+        "genres": [labels[mask] for mask in masks],
+        "average_rating": page["average_rating"].astype(float).to_numpy(),
+        "rating_count": page["rating_count"].astype(int).to_numpy(),
+    }).to_dict("records"), page
+
+
+def register_top_rated_callbacks(app):
     @app.callback(
-        [Output('top-rated-movies-list', 'children'),
-         Output('page-indicator', 'children')],
-        [Input('prev-page-btn', 'n_clicks'),
-         Input('next-page-btn', 'n_clicks'),
+        [Output('top-rated-table', 'data'),
+         Output('top-rated-table', 'page_count'),
+         Output('top-rated-table', 'page_current'),
+         Output('top-rated-table', 'page_size'),
+         Output('top-rated-page-state', 'data'),
+         Output('top-rated-message', 'children')],
+        [Input('top-rated-table', 'page_current'),
+         Input('top-rated-table', 'sort_by'),
+         Input('page-size-dropdown', 'value'),
          Input('min-ratings-input', 'value'),
-         Input('rating-range-slider', 'value')],
-        [State('page-indicator', 'children')]
+         Input('rating-range-slider', 'value'),
+         Input('dataset-selector', 'value')],
+        [State('top-rated-page-state', 'data')]
     )
-    def update_top_movies(prev_clicks, next_clicks, min_ratings, rating_range, page_indicator):
-        # Determine current page
-        page_size = 10
-        trigger = callback_context.triggered[0]['prop_id'].split('.')[0]
-        # Extract current page from indicator, fallback to 1
-        if page_indicator and isinstance(page_indicator, str) and '/' in page_indicator:
-            try:
-                current_page = int(page_indicator.split()[1])
-            except Exception:
-                current_page = 1
-        else:
-            current_page = 1
-        # Update page based on button clicks
-        if trigger == 'next-page-btn':
-            current_page += 1
-        elif trigger == 'prev-page-btn':
-            current_page -= 1
-        # Never go below page 1
-        if current_page < 1:
-            current_page = 1
-        # Filter movies based on minimum ratings and rating range
-        filtered_movies = movies[
-            (movies['rating_count'] >= min_ratings) &
-            (movies['average_rating'] >= rating_range[0]) &
-            (movies['average_rating'] <= rating_range[1])
-        ]
-        total_movies = len(filtered_movies)
+    def update_top_movies(page_current, sort_by, page_size, min_ratings, rating_range, dataset, page_state):
+        ctx = get_data_context(dataset)
+        movies, index = ctx.movies, ctx.top_rated_index
+        query = _query(dataset, min_ratings, rating_range, sort_by, page_size)
+        total_movies = index.count(query["min_ratings"], query["rating_range"])
         total_pages = max(1, math.ceil(total_movies / page_size))
-        # Never go above max page
-        if current_page > total_pages:
-            current_page = total_pages
-        # Calculate the start and end indices for the selected page
-        start_idx = (current_page - 1) * page_size
-        end_idx = start_idx + page_size
-        # Sort filtered movies by average rating and get the selected page
-        top_movies = filtered_movies.sort_values('average_rating', ascending=False).iloc[start_idx:end_idx]
-        row_style = {
-            "display": "flex",
-            "alignItems": "center",
-            "padding": "0 0",
-            "borderBottom": "1px solid #eee",
-            "minHeight": "48px",
-            "maxHeight": "48px",
-            "height": "48px"
-        }
-        # Header row
-        header = html.Div([
-            html.Div("#", style={"width": "40px", "fontWeight": "bold", "color": "#2c8cff", "textAlign": "right"}),
-            html.Div("Title", style={"flex": "3", "fontWeight": "bold", "paddingLeft": "10px"}),
-            html.Div("Genres", style={"flex": "3", "fontWeight": "bold", "color": "#666", "paddingLeft": "10px"}),
-            html.Div("Rating / Users", style={"width": "120px", "fontWeight": "bold", "textAlign": "right", "color": "#666"})
-        ], style={
-            **row_style,
-            "borderBottom": "2px solid #bbb",
-            "background": "#f7f7f7"
-        })
-        # Create a list of movie items
-        movie_list = [header]
-        for i, (_, movie) in enumerate(top_movies.iterrows()):
-            genres = movie['genres']
-            if isinstance(genres, (list, tuple)):
-                genres_str = f"[{', '.join(genres)}]"
-            elif isinstance(genres, str):
-                genres_str = f"[{', '.join(eval(genres) if genres.startswith('[') else genres.split('|'))}]"
-            else:
-                genres_str = "[]"
-            movie_list.append(
-                html.Div([
-                    html.Div(f"{start_idx + i + 1}.", style={"width": "40px", "fontWeight": "bold", "color": "#2c8cff", "textAlign": "right"}),
-                    html.Div(movie['title'], style={"flex": "3", "fontWeight": "bold", "paddingLeft": "10px"}),
-                    html.Div(genres_str, style={"flex": "3", "color": "#666", "paddingLeft": "10px"}),
-                    html.Div(
-                        f"⭐ {movie['average_rating']:.2f}  👥 {movie['rating_count']}",
-                        style={
-                            "width": "120px",
-                            "textAlign": "right",
-                            "color": "#222",
-                            "fontVariantNumeric": "tabular-nums",
-                            "fontFamily": "monospace"
-                        }
-                    )
-                ], style=row_style)
-            )
+
+        state = page_state or {}
+        current_page = page_current or 0
+        if state.get("query") != query:
+            # New filter or sort
+            current_page = 0
+        elif callback_context.triggered_id is None:
+            # First render of the session: show the page the session was on
+            current_page = state["page"]
+        current_page = min(current_page, total_pages - 1)
+
+        # Keyset pagination: step from the cursors of the page shown before
+        # instead of counting rows from the start
+        fetch = {"offset": current_page * page_size}
+        if state.get("query") == query and state.get("first"):
+            if current_page == state["page"] + 1:
+                fetch = {"after": tuple(state["last"])}
+            elif current_page == state["page"] - 1:
+                fetch = {"before": tuple(state["first"])}
+            elif current_page == state["page"]:
+                fetch = {"at": tuple(state["first"])}
+        positions, first_rank = index.page(
+            query["min_ratings"], query["rating_range"], page_size,
+            sort_by=query["sort_by"], descending=query["descending"], **fetch
+        )
+        rows, page = _page_rows(movies, positions, first_rank)
+        # Fetch the posters of the visible page before one is picked
+        get_poster_prefetcher().prefetch(page["imdbId"].tolist(), channel="top-rated")
+
         # If no movies match the criteria
-        if len(movie_list) == 1:
-            return html.Div(
-                "No movies match the selected criteria. Try adjusting the filters.",
-                style={
-                    "textAlign": "center",
-                    "padding": "20px",
-                    "color": "#666"
-                }
-            ), f"Page {current_page} / {total_pages}"
-        return movie_list, f"Page {current_page} / {total_pages}" 
\ No newline at end of file
+        message = ""
+        if not rows:
+            message = "No movies match the selected criteria. Try adjusting the filters."
+
+        page_state = {
+            "query": query,
+            "page": current_page,
+            "first": _cursor(page.iloc[0], query["sort_by"]) if rows else None,
+            "last": _cursor(page.iloc[-1], query["sort_by"]) if rows else None,
+        }
+        return rows, total_pages, current_page, page_size, page_state, message
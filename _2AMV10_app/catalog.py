@@ -0,0 +1,112 @@
+import copy
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from .genres import decode_genres
+
+logger = logging.getLogger(__name__)
+
+
+class MovieCatalog:
+    """
+    Movies keyed by imdbId and movieId.
+
+    Both ids map to row positions in the movies frame through dicts built
+    once, so resolving a selection is a hash lookup instead of a scan of
+    the id column. The accessors read from plain arrays and return Python
+    values, ready for the layout and for JSON.
+    """
+
+    def __init__(self, movie_ids, imdb_ids, titles, genre_masks, average_ratings, rating_counts):
+        """
+        Args:
+            movie_ids, imdb_ids, titles, genre_masks, average_ratings, rating_counts
+                (ndarray): Columns of the movies frame, in its row order.
+        """
+        self.movie_ids = movie_ids
+        self.imdb_ids = imdb_ids
+        self.titles = titles
+        self.genre_masks = genre_masks
+        self.average_ratings = average_ratings
+        self.rating_counts = rating_counts
+        self._by_imdb_id = {imdb_id: pos for pos, imdb_id in enumerate(imdb_ids.tolist()) if pd.notna(imdb_id)}
+        self._by_movie_id = {movie_id: pos for pos, movie_id in enumerate(movie_ids.tolist())}
+
+    @classmethod
+    def from_movies(cls, movies, histograms=None):
+        """
+        Builds the catalog from movies with movieId, imdbId, title, genre_mask,
+        average_rating and rating_count.
+
+        Args:
+            histograms (RatingHistograms): Rating histograms in the row order of
+                movies; when given, average ratings and rating counts are
+                derived from them instead of the movies columns.
+        """
+        start = time.perf_counter()
+        if histograms is not None:
+            average_ratings, rating_counts = histograms.average_rating(), histograms.rating_count()
+        else:
+            average_ratings = movies["average_rating"].to_numpy(dtype=np.float64, na_value=np.nan)
+            rating_counts = movies["rating_count"].to_numpy()
+        catalog = cls(
+            movies["movieId"].to_numpy(),
+            movies["imdbId"].to_numpy(dtype=object, na_value=None),
+            movies["title"].astype(str).to_numpy(),
+            movies["genre_mask"].to_numpy(),
+            average_ratings,
+            rating_counts,
+        )
+        logger.debug(f"Built movie catalog of {len(movies)} movies in {time.perf_counter() - start:.4f}s")
+        return catalog
+
+    def with_ratings(self, average_ratings, rating_counts):
+        """
+        Copy of the catalog with new rating stats, sharing the ids, titles and indexes.
+        """
+        catalog = copy.copy(self)
+        catalog.average_ratings = average_ratings
+        catalog.rating_counts = rating_counts
+        return catalog
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    @property
+    def nbytes(self):
+        arrays = [self.movie_ids, self.genre_masks, self.average_ratings, self.rating_counts]
+        # Roughly 100 bytes per dict entry and per id or title string
+        return int(sum(a.nbytes for a in arrays) + 100 * (len(self._by_imdb_id) + len(self._by_movie_id) + 2 * len(self)))
+
+    def find(self, imdb_id):
+        """
+        Row position of the movie with an IMDb id, None if there is none.
+        """
+        return self._by_imdb_id.get(imdb_id) if imdb_id else None
+
+    def find_movie(self, movie_id):
+        """
+        Row position of the movie with a MovieLens movieId, None if there is none.
+        """
+        return self._by_movie_id.get(int(movie_id))
+
+    def movie_id(self, pos):
+        return int(self.movie_ids[pos])
+
+    def imdb_id(self, pos):
+        return self.imdb_ids[pos]
+
+    def title(self, pos):
+        return str(self.titles[pos])
+
+    def genres(self, pos):
+        return decode_genres(self.genre_masks[pos])
+
+    def average_rating(self, pos):
+        return float(self.average_ratings[pos])
+
+    def rating_count(self, pos):
+        return int(self.rating_counts[pos])
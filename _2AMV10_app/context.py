@@ -0,0 +1,453 @@
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from flask import g, has_request_context, request_tearing_down
+
+from pathlib import Path
+
+from .aggregates import ChartAggregates
+from .cache import fingerprint_sources
+from .catalog import MovieCatalog
+from .data import CACHE_DIR_NAME, DATA_DIR, SOURCE_FILES, load_frames, load_ratings
+from .datasets import DEFAULT_DATASET, DEFAULT_DATASETS_BUDGET_MB, DatasetRegistry
+from .figures import FigureCache
+from .genome import GenomeMatrix
+from .genres import GENRES, explode_genres
+from .histograms import RatingHistograms
+from .ingest import DEFAULT_MEMORY_BUDGET_MB, RatingAggregates
+from .ratings_index import RatingsIndex
+from .search import TitleSearchIndex
+from .top_rated import TopRatedIndex
+
+logger = logging.getLogger(__name__)
+
+# Artifacts computed from the rating aggregates, rebuilt when a snapshot
+# is derived with new ratings (see DataContext.derive)
+_RATING_ARTIFACTS = [
+    "catalog", "chart_aggregates", "figures", "rating_histograms", "top_rated_index", "title_search",
+]
+
+
+def memory_bytes(value):
+    """
+    Estimates the memory held by a loaded artifact in bytes.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if hasattr(value, "nbytes"):
+        # numpy arrays and array stores such as RatingsIndex
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(memory_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(memory_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class DataContext:
+    """
+    Shared, lazily built data for all views and callbacks.
+
+    Every artifact is built the first time it is requested and memoized, so
+    after warm_up() no callback reads from disk again. Build time and memory
+    use of each artifact are recorded and available through report().
+
+    The ratings themselves are not kept: the frames hold their per-movie
+    aggregates, and ratings.csv is read again only to build the ratings
+    index (in chunks within memory_budget_mb with streaming=True) or if
+    something asks for ctx.ratings.
+
+    A context is one published snapshot of the data (see
+    snapshots.SnapshotStore): its frames and artifacts are shared by
+    concurrent requests and must never be modified. Updates build a new
+    context instead, e.g. with derive().
+    """
+
+    def __init__(self, data_dir=DATA_DIR, use_cache=True, compact=True, streaming=False,
+                 memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.data_dir = data_dir
+        self.use_cache = use_cache
+        self.compact = compact
+        self.streaming = streaming
+        self.memory_budget_mb = memory_budget_mb
+        self._artifacts = {}
+        self._stats = {}
+        # One lock per artifact so independent artifacts can build in parallel
+        self._build_locks = {}
+        self._build_locks_guard = threading.Lock()
+        self._local = threading.local()
+        # Version number assigned when the snapshot is published
+        self.version = 0
+        # Versioned on-disk cache directories this snapshot reads from
+        self.cache_dirs = set()
+
+    def _artifact(self, name, builder):
+        """
+        Returns the memoized artifact, building it on first use.
+        """
+        if name in self._artifacts:
+            return self._artifacts[name]
+        # Time spent on (or waiting for) dependencies is not counted as own build time
+        stack = self._local.__dict__.setdefault("stack", [])
+        start = time.perf_counter()
+        with self._build_locks_guard:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            if name not in self._artifacts:
+                stack.append(0.0)
+                try:
+                    value = builder()
+                finally:
+                    dependencies = stack.pop()
+                elapsed = time.perf_counter() - start - dependencies
+                self._artifacts[name] = value
+                self._stats[name] = {"build_seconds": elapsed, "memory_bytes": memory_bytes(value)}
+                logger.debug(f"Built artifact '{name}' in {elapsed:.3f}s")
+        if stack:
+            stack[-1] += time.perf_counter() - start
+        return self._artifacts[name]
+
+    @property
+    def frames(self):
+        """
+        Frames as returned by data.load_frames(), keyed by name.
+        """
+        # Fingerprint the sources before reading them, so a file changed
+        # during the load is picked up by the next reload
+        self.fingerprint
+        return self._artifact("frames", lambda: load_frames(
+            self.data_dir, use_cache=self.use_cache, compact=self.compact,
+            streaming=self.streaming, memory_budget_mb=self.memory_budget_mb,
+        ))
+
+    @property
+    def fingerprint(self):
+        """
+        Fingerprint of the source files the cached artifacts were built from.
+        """
+        return self._artifact(
+            "fingerprint",
+            lambda: fingerprint_sources(
+                self.data_dir, SOURCE_FILES, extra={"compact": self.compact, "streaming": self.streaming}
+            ),
+        )
+
+    @property
+    def movies(self):
+        return self.frames["movies"]
+
+    @property
+    def catalog(self):
+        """
+        Movies keyed by imdbId and movieId (see catalog.MovieCatalog).
+        """
+        return self._artifact("catalog", lambda: MovieCatalog.from_movies(self.movies, self.rating_histograms))
+
+    @property
+    def ratings(self):
+        """
+        The full ratings table, read from ratings.csv on first use.
+        """
+        return self._artifact("ratings", lambda: load_ratings(self.data_dir, compact=self.compact))
+
+    @property
+    def rating_aggregates(self):
+        """
+        Per-movie rating sum, count, first/last timestamp and histogram, and
+        the rating totals per day.
+        """
+        return self._artifact(
+            "rating_aggregates",
+            lambda: RatingAggregates.from_frame(self.frames["rating_stats"], self.frames["rating_days"]),
+        )
+
+    @property
+    def rating_histograms(self):
+        """
+        Ratings per half-star value of every movie, in the row order of movies
+        (see histograms.RatingHistograms).
+        """
+        return self._artifact(
+            "rating_histograms",
+            lambda: RatingHistograms.from_aggregates(self.movies["movieId"].to_numpy(), self.rating_aggregates),
+        )
+
+    @property
+    def chart_aggregates(self):
+        """
+        Precomputed tables of the chart selector (see aggregates.ChartAggregates).
+        """
+        return self._artifact("chart_aggregates", lambda: ChartAggregates.build(self.movies, self.rating_aggregates))
+
+    @property
+    def tags(self):
+        return self.frames["tags"]
+
+    @property
+    def links(self):
+        return self.frames["links"]
+
+    @property
+    def genome_tags(self):
+        return self.frames["genome_tags"]
+
+    @property
+    def genre_trends(self):
+        """
+        Average rating per genre per year (see data.get_genre_data).
+        """
+        return self.frames["genre"]
+
+    @property
+    def top_rated_index(self):
+        """
+        Movies pre-sorted by average rating for the top-rated pager.
+        """
+        return self._artifact("top_rated_index", lambda: TopRatedIndex.from_movies(self.movies))
+
+    @property
+    def title_search(self):
+        """
+        Search-as-you-type index over the movie titles, ranked by number of ratings.
+        """
+        return self._artifact("title_search", lambda: TitleSearchIndex.from_movies(self.movies))
+
+    @property
+    def figures(self):
+        """
+        Server-side cache of base figures shared by the callbacks.
+        """
+        return self._artifact("figures", FigureCache)
+
+    @property
+    def ratings_index(self):
+        """
+        Ratings sorted by movieId with CSR offsets, memory-mapped from the cache.
+        """
+        def build():
+            if not self.use_cache and not self.streaming:
+                return RatingsIndex.from_frame(load_ratings(self.data_dir, compact=self.compact))
+            self.frames  # Makes sure the cache directory is current
+            # One directory per version of the sources, so rebuilding never
+            # overwrites files an older snapshot still has memory-mapped
+            index_dir = Path(self.data_dir) / CACHE_DIR_NAME / "ratings_index" / self.fingerprint[:16]
+            self.cache_dirs.add(index_dir)
+            index = RatingsIndex.load(index_dir, self.fingerprint)
+            if index is None and self.streaming:
+                index = RatingsIndex.from_csv(
+                    Path(self.data_dir) / "ratings.csv", self.rating_aggregates, index_dir,
+                    self.fingerprint, self.memory_budget_mb,
+                )
+            elif index is None:
+                # Read for this build only, the snapshot never keeps the ratings
+                RatingsIndex.from_frame(load_ratings(self.data_dir, compact=self.compact)).save(
+                    index_dir, self.fingerprint
+                )
+                index = RatingsIndex.load(index_dir, self.fingerprint)
+            return index
+        return self._artifact("ratings_index", build)
+
+    @property
+    def genome_fingerprint(self):
+        return self._artifact("genome_fingerprint", lambda: fingerprint_sources(self.data_dir, ["genome-scores.csv"]))
+
+    def sources_changed(self):
+        """
+        Whether the source files differ from those this snapshot was loaded from.
+        """
+        fingerprint = fingerprint_sources(
+            self.data_dir, SOURCE_FILES, extra={"compact": self.compact, "streaming": self.streaming}
+        )
+        genome_fingerprint = fingerprint_sources(self.data_dir, ["genome-scores.csv"])
+        return fingerprint != self.fingerprint or genome_fingerprint != self.genome_fingerprint
+
+    @property
+    def genome(self):
+        """
+        Memory-mapped movie x tag genome matrix, None without genome-scores.csv.
+        """
+        def build():
+            csv_path = Path(self.data_dir) / "genome-scores.csv"
+            if not csv_path.exists():
+                return None
+            fingerprint = self.genome_fingerprint
+            matrix_dir = Path(self.data_dir) / CACHE_DIR_NAME / "genome" / fingerprint[:16]
+            self.cache_dirs.add(matrix_dir)
+            matrix = GenomeMatrix.load(matrix_dir, fingerprint, self.genome_tags)
+            if matrix is None:
+                GenomeMatrix.build(csv_path, matrix_dir, fingerprint)
+                matrix = GenomeMatrix.load(matrix_dir, fingerprint, self.genome_tags)
+            return matrix
+        return self._artifact("genome", build)
+
+    @property
+    def genre_tag_matrix(self):
+        """
+        Number of movies per genre (rows) carrying each tag (columns).
+        """
+        def build():
+            rows, genre_idx = explode_genres(self.movies["genre_mask"].to_numpy())
+            movie_genres = pd.DataFrame({
+                "movieId": self.movies["movieId"].to_numpy()[rows],
+                "genre": np.array(GENRES, dtype=object)[genre_idx],
+            })
+
+            tags_with_genre = self.tags.merge(movie_genres, on="movieId", how="inner")[["movieId", "tag", "genre"]]
+            genre_tag_counts = tags_with_genre.drop_duplicates(subset=["movieId", "tag", "genre"]).groupby(["genre", "tag"], observed=True)["movieId"].nunique().reset_index(name="count_movies_with_tag")
+            return genre_tag_counts.pivot(index="genre", columns="tag", values="count_movies_with_tag").fillna(0)
+        return self._artifact("genre_tag_matrix", build)
+
+    @property
+    def genre_tag_tfidf(self):
+        """
+        TF-IDF weighted version of genre_tag_matrix.
+        """
+        def build():
+            from sklearn.feature_extraction.text import TfidfTransformer
+
+            matrix = self.genre_tag_matrix
+            tfidf = TfidfTransformer(norm="l2", smooth_idf=True)
+            tfidf_matrix = tfidf.fit_transform(matrix.values)
+            return pd.DataFrame(tfidf_matrix.toarray(), index=matrix.index, columns=matrix.columns)
+        return self._artifact("genre_tag_tfidf", build)
+
+    @property
+    def has_ml_metadata(self):
+        """
+        Whether the dataset has the movies_metadata.csv the revenue model is trained on.
+        """
+        return (Path(self.data_dir) / "movies_metadata.csv").exists()
+
+    @property
+    def ml_data(self):
+        """
+        Trained revenue model and its options (see ML_data.load_ml_data).
+        """
+        def build():
+            from .ML_data import load_ml_data
+
+            return load_ml_data(self.movies[["movieId", "title", "genres", "genre_mask"]], self.links, df_metadata=self.ml_metadata)
+        return self._artifact("ml_data", build)
+
+    @property
+    def ml_metadata(self):
+        """
+        Raw movies_metadata.csv used to train the revenue model.
+        """
+        return self._artifact("ml_metadata", lambda: pd.read_csv(Path(self.data_dir) / "movies_metadata.csv"))
+
+    def derive(self, frames, **artifacts):
+        """
+        Returns a new snapshot with some frames and artifacts replaced.
+
+        Artifacts that do not depend on the ratings are shared with this
+        snapshot instead of being rebuilt; the rating-derived ones
+        (_RATING_ARTIFACTS) are rebuilt on first use.
+
+        Args:
+            frames (dict[str, DataFrame]): Frames to replace, by name.
+            **artifacts: Artifacts to replace, by name.
+        """
+        snapshot = DataContext(self.data_dir, self.use_cache, self.compact, self.streaming, self.memory_budget_mb)
+        shared = {name: value for name, value in self._artifacts.items() if name not in _RATING_ARTIFACTS}
+        shared["frames"] = {**self.frames, **frames}
+        shared.update(artifacts)
+        snapshot._artifacts.update(shared)
+        snapshot._stats.update({name: stats for name, stats in self._stats.items() if name in shared})
+        snapshot.cache_dirs = set(self.cache_dirs)
+        return snapshot
+
+    def close(self):
+        """
+        Drops the references to the artifacts of a released snapshot.
+        """
+        self._artifacts.clear()
+
+    def warm_up(self, include_ml=True):
+        """
+        Builds every artifact the callbacks need so requests never hit the disk.
+
+        Independent artifacts are built concurrently; artifacts that depend on
+        others wait for them through their build locks.
+        """
+        names = ["frames", "catalog", "chart_aggregates", "top_rated_index", "title_search", "genome", "genre_tag_matrix", "genre_tag_tfidf"]
+        if include_ml:
+            names += ["ml_metadata", "ml_data"]
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="warm-up") as pool:
+            # Surfaces the first build error, like sequential access would
+            list(pool.map(lambda name: getattr(self, name), names))
+        return self
+
+    @property
+    def memory_bytes(self):
+        """
+        Estimated memory held by the artifacts built so far.
+        """
+        return sum(stats["memory_bytes"] for stats in list(self._stats.values()))
+
+    def report(self):
+        """
+        Returns build time and memory use per artifact built so far.
+        """
+        report = pd.DataFrame.from_dict(self._stats, orient="index")
+        if report.empty:
+            return pd.DataFrame(columns=["build_seconds", "memory_mb"])
+        report["memory_mb"] = report.pop("memory_bytes") / 2**20
+        return report.round(3)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_dataset_registry():
+    """
+    Returns the process-wide DatasetRegistry, creating it on first use.
+
+    The datasets are data/ itself and its subdirectories holding a
+    movies.csv; the memory budget can be set in DATASETS_MEMORY_BUDGET_MB.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                budget = float(os.getenv("DATASETS_MEMORY_BUDGET_MB", DEFAULT_DATASETS_BUDGET_MB))
+                _registry = DatasetRegistry(DataContext, memory_budget_mb=budget).discover(DATA_DIR)
+    return _registry
+
+
+def get_snapshot_store(dataset=None):
+    """
+    Returns the SnapshotStore of a dataset, the default one when None.
+    """
+    return get_dataset_registry().store(dataset)
+
+
+def get_data_context(dataset=None):
+    """
+    Returns the current DataContext snapshot of a dataset, the default one when None.
+
+    Within a request the snapshot is pinned on first use and released when
+    the request ends, so a callback reads one consistent version even if a
+    reload publishes a new snapshot or the dataset is evicted meanwhile.
+    """
+    dataset = dataset or DEFAULT_DATASET
+    if not has_request_context():
+        return get_snapshot_store(dataset).current
+    pinned = g.setdefault("data_contexts", {})
+    if dataset not in pinned:
+        pinned[dataset] = get_dataset_registry().acquire(dataset)
+    return pinned[dataset][1]
+
+
+@request_tearing_down.connect
+def _release_data_context(sender, **extra):
+    for store, snapshot in g.pop("data_contexts", {}).values():
+        store.release(snapshot)
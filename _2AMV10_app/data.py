@@ -1,75 +1,337 @@
+import numpy as np
 import pandas as pd
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from .cache import fingerprint_sources, load_cached_frames, save_cached_frames
+from .genres import GENRES, encode_genres, explode_genres
+from .ingest import DEFAULT_MEMORY_BUDGET_MB, RATINGS_DTYPES, RatingAggregates, aggregate_ratings
 
-def get_all_data():
-    # Get the base directory (project root)
-    data_dir = Path(__file__).resolve().parent.parent / "data"
+logger = logging.getLogger(__name__)
 
-    # Build paths to the CSV files in the data folder
-    genome_scores = pd.DataFrame()  # Set as empty DataFrame
-    genome_tags = pd.read_csv(data_dir / "genome-tags.csv")
-    links = pd.read_csv(data_dir / "links.csv")
-    movies = pd.read_csv(data_dir / "movies.csv")
-    ratings = pd.read_csv(data_dir / "ratings.csv")
-    tags = pd.read_csv(data_dir / "tags.csv")
+# Get the base directory (project root)
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 
+# CSV files that feed get_all_data(); a change to any of them invalidates the cache
+SOURCE_FILES = ["genome-tags.csv", "links.csv", "movies.csv", "ratings.csv", "tags.csv"]
+
+# Root of the on-disk caches (Parquet frames, ratings index, genome matrix) inside a data directory
+CACHE_DIR_NAME = ".cache"
+
+# Frames stored in the on-disk cache, in the order get_all_data() returns them
+CACHED_FRAMES = ["genome_tags", "links", "movies", "tags", "genre"]
+
+
+def get_genre_data(movies, first_ratings):
+    """
+    Creates a DataFrame with average rating per genre per year,
+    based on the earliest rating timestamp per movie.
+
+    Args:
+        movies (DataFrame): Movies with genre_mask and average_rating.
+        first_ratings (DataFrame): movieId and its earliest rating timestamp.
+    """
+    # Step 1: Take the earliest rating year per movie
+    first_ratings = first_ratings[['movieId', 'timestamp']].copy()
+    first_ratings['year'] = pd.to_datetime(first_ratings['timestamp'], unit='s').dt.year
+
+    # Step 2: Align the years with the movies
+    years = movies[['movieId']].merge(first_ratings[['movieId', 'year']], on='movieId', how='left')['year'].to_numpy()
+
+    # Step 3: One row per (movie, genre) from the genre bitmasks
+    rows, genre_idx = explode_genres(movies['genre_mask'].to_numpy())
+    genre = pd.DataFrame({
+        'year': years[rows],
+        'genre': np.array(GENRES, dtype=object)[genre_idx],
+        'average_rating': movies['average_rating'].to_numpy()[rows],
+    })
+
+    # Step 4: Group by year and genre
+    genre = (
+        genre.groupby(['year', 'genre'])['average_rating']
+        .mean()
+        .reset_index()
+        .rename(columns={'average_rating': 'avg_rating'})
+    )
+
+    return genre
+
+
+def _format_links(links):
     # Add formatted IMDb IDs to links
     links["imdbId"] = links["imdbId"].apply(lambda x: f"tt{int(x):07d}")
+    return links
+
+
+def _aggregate_ratings(ratings, data_dir, streaming, memory_budget_mb):
+    # Per-movie sum, count, first/last timestamp and histogram plus the
+    # daily totals in a single pass
+    if streaming:
+        return aggregate_ratings(data_dir / "ratings.csv", memory_budget_mb)
+    return RatingAggregates.from_chunk(ratings)
+
 
-    # Calculate average rating and rating count for each movie
-    movie_ratings = ratings.groupby('movieId').agg({
-        'rating': ['mean', 'count']
-    }).reset_index()
-    movie_ratings.columns = ['movieId', 'average_rating', 'rating_count']
+def _rating_stats(aggregates):
+    # One row per movie with the aggregates and the average rating
+    return aggregates.to_frame()
+
+
+def _merge_movies(movies, links, rating_stats):
+    # Average rating and rating count for each movie
+    movie_ratings = rating_stats[['movieId', 'average_rating', 'rating_count']]
 
     # Merge imdbId into movies
     movies = movies.merge(links[["movieId", "imdbId"]], on="movieId", how="left")
-    
+
     # Merge rating statistics into movies
     movies = movies.merge(movie_ratings, on="movieId", how="left")
-    
-    # Fill NaN values for movies with no ratings
-    movies['average_rating'] = movies['average_rating'].fillna(0)
+
+    # Movies with no ratings have no ratings counted and a NaN average
     movies['rating_count'] = movies['rating_count'].fillna(0)
 
-    def get_genre_data(movies, ratings):
-        """
-        Creates a DataFrame with average rating per genre per year,
-        based on the earliest rating timestamp per movie.
-        """
-        # Step 1: Copy movies DataFrame
-        genre = movies.copy()
-
-        # Step 2: Merge in ratings to get earliest rating year
-        first_ratings = (
-            ratings.groupby('movieId')['timestamp']
-            .min()
-            .reset_index()
-        )
-        first_ratings['year'] = pd.to_datetime(first_ratings['timestamp'], unit='s').dt.year
+    # Encode genres once as a bitmask over the fixed genre vocabulary
+    movies['genre_mask'] = encode_genres(movies['genres'])
+    return movies
+
+
+def _genre_data(movies, rating_stats):
+    first_ratings = rating_stats[['movieId', 'first_timestamp']].rename(columns={'first_timestamp': 'timestamp'})
+    return get_genre_data(movies, first_ratings)
+
+
+def build_data(data_dir=DATA_DIR, streaming=False, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, max_workers=None):
+    """
+    Parses the CSV files and derives the movie and genre tables.
+
+    The CSV files are parsed concurrently on a thread pool and every derived
+    step starts as soon as its inputs are ready, so the wall-clock time is
+    roughly that of the largest file plus the final merges. Each step's
+    duration is logged. The ratings themselves are dropped once their
+    aggregates are derived; see load_ratings().
+
+    Args:
+        data_dir (Path): Directory holding the MovieLens CSV files.
+        streaming (bool): Aggregate ratings.csv chunk by chunk instead of
+            loading it whole.
+        memory_budget_mb (int): Peak memory for the streaming pass.
+        max_workers (int): Size of the thread pool, one per step by default.
 
-        # Step 3: Merge year into genre DataFrame
-        genre = genre.merge(first_ratings[['movieId', 'year']], on='movieId', how='left')
+    Returns:
+        dict[str, DataFrame]: The frames listed in CACHED_FRAMES plus the
+        per-movie rating aggregates as rating_stats and the rating totals
+        per day as rating_days.
+    """
+    def timed(label, fn, *args):
+        # Inputs are futures of steps submitted earlier, so waiting on them
+        # never starves the pool
+        args = [arg.result() if isinstance(arg, Future) else arg for arg in args]
+        start = time.perf_counter()
+        result = fn(*args)
+        logger.info(f"{label} took {time.perf_counter() - start:.2f}s")
+        return result
 
-        # Step 4: Split and explode genres
-        genre['genres'] = genre['genres'].str.split('|')
-        genre = genre.explode('genres')
+    with ThreadPoolExecutor(max_workers=max_workers or 9, thread_name_prefix="load") as pool:
+        def step(label, fn, *args):
+            return pool.submit(timed, label, fn, *args)
 
-        # Step 5: Group by year and genre
-        genre = (
-            genre.groupby(['year', 'genres'])['average_rating']
-            .mean()
-            .reset_index()
-            .rename(columns={'genres': 'genre', 'average_rating': 'avg_rating'})
+        genome_tags = step("Reading genome-tags.csv", pd.read_csv, data_dir / "genome-tags.csv")
+        links = step("Reading links.csv", pd.read_csv, data_dir / "links.csv")
+        movies = step("Reading movies.csv", pd.read_csv, data_dir / "movies.csv")
+        tags = step("Reading tags.csv", pd.read_csv, data_dir / "tags.csv")
+        ratings = None if streaming else step("Reading ratings.csv", pd.read_csv, data_dir / "ratings.csv")
+
+        links = step("Formatting IMDb ids", _format_links, links)
+        aggregates = step("Aggregating ratings", _aggregate_ratings, ratings, data_dir, streaming, memory_budget_mb)
+        rating_stats = step("Tabulating rating stats", _rating_stats, aggregates)
+        movies = step("Merging movies", _merge_movies, movies, links, rating_stats)
+        genre = step("Building genre trends", _genre_data, movies, rating_stats)
+
+        return {
+            "genome_tags": genome_tags.result(),
+            "links": links.result(),
+            "movies": movies.result(),
+            "tags": tags.result(),
+            "genre": genre.result(),
+            "rating_stats": rating_stats.result(),
+            "rating_days": aggregates.result().daily.to_frame(),
+        }
+
+
+def _downcast_ids(series):
+    # Smallest signed integer type that holds every id
+    return pd.to_numeric(series, downcast="integer")
+
+
+def _downcast_timestamps(series):
+    # Unix seconds fit in int32 until 2038
+    if series.empty or series.max() <= np.iinfo(np.int32).max:
+        return series.astype("int32")
+    return series
+
+
+def compact_frames(frames):
+    """
+    Returns copies of the frames in a compact schema.
+
+    Ids are downcast to the smallest integer type, average ratings to
+    float32, timestamps to int32, genres, tags and genres per year become
+    categoricals and titles and IMDb ids become Arrow-backed strings.
+    """
+    arrow_string = pd.StringDtype("pyarrow")
+    movies = frames["movies"]
+    rating_stats = frames["rating_stats"]
+    tags = frames["tags"]
+    links = frames["links"]
+    genome_tags = frames["genome_tags"]
+    genre = frames["genre"]
+    rating_days = frames["rating_days"]
+
+    return {
+        "genome_tags": genome_tags.assign(
+            tagId=_downcast_ids(genome_tags["tagId"]),
+            tag=genome_tags["tag"].astype(arrow_string),
+        ),
+        "links": links.assign(
+            movieId=_downcast_ids(links["movieId"]),
+            imdbId=links["imdbId"].astype(arrow_string),
+            tmdbId=links["tmdbId"].astype("Int32"),
+        ),
+        "movies": movies.assign(
+            movieId=_downcast_ids(movies["movieId"]),
+            title=movies["title"].astype(arrow_string),
+            genres=movies["genres"].astype("category"),
+            imdbId=movies["imdbId"].astype(arrow_string),
+            average_rating=movies["average_rating"].astype("float32"),
+            rating_count=movies["rating_count"].astype("int32"),
+        ),
+        "tags": tags.assign(
+            userId=_downcast_ids(tags["userId"]),
+            movieId=_downcast_ids(tags["movieId"]),
+            tag=tags["tag"].astype("category"),
+            timestamp=_downcast_timestamps(tags["timestamp"]),
+        ),
+        "genre": genre.assign(
+            year=genre["year"].astype("float32"),
+            genre=genre["genre"].astype("category"),
+            avg_rating=genre["avg_rating"].astype("float32"),
+        ),
+        "rating_stats": rating_stats.astype({
+            "movieId": "int32",
+            "rating_count": "int32",
+            "average_rating": "float32",
+            **{c: "int32" for c in rating_stats.columns if c.startswith("hist_")},
+        }).assign(
+            first_timestamp=_downcast_timestamps(rating_stats["first_timestamp"]),
+            last_timestamp=_downcast_timestamps(rating_stats["last_timestamp"]),
+        ),
+        "rating_days": rating_days.astype({"rating_count": "int32"}),
+    }
+
+
+def memory_report(before, after):
+    """
+    Compares the memory use of two sets of frames, e.g. before and after compact_frames().
+
+    Returns:
+        DataFrame: before_mb, after_mb and the saving per frame.
+    """
+    def size_mb(frame):
+        return frame.memory_usage(deep=True).sum() / 2**20
+
+    report = pd.DataFrame({
+        "before_mb": {name: size_mb(frame) for name, frame in before.items() if frame is not None},
+        "after_mb": {name: size_mb(frame) for name, frame in after.items() if frame is not None},
+    })
+    report.loc["total"] = report.sum()
+    report["saved_pct"] = 100 * (1 - report["after_mb"] / report["before_mb"])
+    return report.round(2)
+
+
+def load_frames(data_dir=DATA_DIR, use_cache=True, compact=False, streaming=False,
+                memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Loads all MovieLens frames, served from the on-disk Parquet cache when
+    the source CSVs have not changed since it was written.
+
+    Args:
+        data_dir (Path): Directory holding the MovieLens CSV files.
+        use_cache (bool): Read and write the cache in data_dir/.cache/frames.
+        compact (bool): Return the frames in the compact schema (see compact_frames).
+        streaming (bool): Aggregate ratings.csv in bounded memory.
+        memory_budget_mb (int): Peak memory for the streaming pass.
+
+    Returns:
+        dict[str, DataFrame]: The frames by name (see build_data).
+    """
+    data_dir = Path(data_dir)
+    cache_dir = data_dir / CACHE_DIR_NAME / "frames"
+    start = time.perf_counter()
+
+    frames = None
+    if use_cache:
+        fingerprint = fingerprint_sources(data_dir, SOURCE_FILES, extra={"compact": compact, "streaming": streaming})
+        frames = load_cached_frames(cache_dir, fingerprint)
+        if frames is not None:
+            logger.info(f"Loaded data from cache in {time.perf_counter() - start:.2f}s")
+
+    if frames is None:
+        frames = build_data(data_dir, streaming, memory_budget_mb)
+        if compact:
+            compacted = compact_frames(frames)
+            logger.debug(f"Compact schema memory use:\n{memory_report(frames, compacted)}")
+            frames = compacted
+        logger.info(f"Parsed CSV data in {time.perf_counter() - start:.2f}s")
+        if use_cache:
+            save_cached_frames(cache_dir, fingerprint, frames)
+
+    return frames
+
+
+def load_ratings(data_dir=DATA_DIR, compact=False):
+    """
+    Reads the full ratings table from ratings.csv.
+
+    The loaded frames only keep per-movie rating aggregates; the ratings
+    themselves are read again only when something needs every rating,
+    such as building the ratings index.
+
+    Args:
+        data_dir (Path): Directory holding the MovieLens CSV files.
+        compact (bool): Downcast ids and timestamps like compact_frames().
+    """
+    start = time.perf_counter()
+    ratings = pd.read_csv(Path(data_dir) / "ratings.csv", dtype=RATINGS_DTYPES)
+    if compact:
+        ratings = ratings.assign(
+            userId=_downcast_ids(ratings["userId"]),
+            movieId=_downcast_ids(ratings["movieId"]),
+            timestamp=_downcast_timestamps(ratings["timestamp"]),
         )
+    logger.info(f"Read {len(ratings)} ratings in {time.perf_counter() - start:.2f}s")
+    return ratings
+
 
-        return genre
+def get_all_data(data_dir=DATA_DIR, use_cache=True, compact=False, streaming=False):
+    """
+    Loads all MovieLens frames (see load_frames) and the ratings (see load_ratings).
 
-    genre = get_genre_data(movies, ratings)
-    return genome_scores, genome_tags, links, movies, ratings, tags, genre
+    Returns:
+        tuple: genome_scores, genome_tags, links, movies, ratings, tags, genre
+    """
+    frames = load_frames(data_dir, use_cache=use_cache, compact=compact, streaming=streaming)
+    # The long-format scores are too large to load; see DataContext.genome for the matrix
+    genome_scores = pd.DataFrame()
+    ratings = load_ratings(data_dir, compact=compact)
+    return (genome_scores, frames["genome_tags"], frames["links"], frames["movies"], ratings,
+            frames["tags"], frames["genre"])
 
 if __name__ == "__main__":
     genome_scores, genome_tags, links, movies, ratings, tags, genre = get_all_data()
+
+    # Memory saved by the compact schema
+    frames = load_frames()
+    print(memory_report(frames, compact_frames(frames)))
     
     # Print example movie with its rating statistics
     #print(movies[movies["imdbId"] == 'tt0111161'])
@@ -84,4 +346,4 @@ if __name__ == "__main__":
 
     #ratings.sort_values(by="datetime", ascending=True)
     #print(ratings)
-    #print(movies)
\ No newline at end of file
+    #print(movies)
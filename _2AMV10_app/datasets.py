@@ -0,0 +1,170 @@
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .snapshots import DEFAULT_RELOAD_INTERVAL, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# Name of the dataset in the data directory itself
+DEFAULT_DATASET = "default"
+
+# Memory the loaded datasets may use together before the least recently used ones are evicted
+DEFAULT_DATASETS_BUDGET_MB = 4096
+
+
+class DatasetRegistry:
+    """
+    Named MovieLens datasets served side by side by one process.
+
+    Every dataset has its own SnapshotStore, so its cached artifacts live in
+    its own data directory and it reloads independently of the others. A
+    dataset is loaded lazily the first time it is asked for. Whenever the
+    loaded datasets together use more than memory_budget_mb, the least
+    recently used ones are unloaded until they fit again; the dataset just
+    asked for is never evicted, and an evicted dataset loads again from its
+    on-disk cache the next time it is used.
+    """
+
+    def __init__(self, factory, memory_budget_mb=DEFAULT_DATASETS_BUDGET_MB):
+        """
+        Args:
+            factory (callable): Returns a new DataContext for a data directory.
+            memory_budget_mb (float): Memory budget of all loaded datasets together.
+        """
+        self._factory = factory
+        self.memory_budget_mb = memory_budget_mb
+        self._data_dirs = {}
+        # Loaded datasets, least recently used first
+        self._resident = OrderedDict()
+        self._lock = threading.Lock()
+        self._watch_interval = None
+
+    def register(self, name, data_dir):
+        """
+        Adds a dataset; it is not loaded until it is used.
+        """
+        with self._lock:
+            self._data_dirs[name] = Path(data_dir)
+        logger.debug(f"Registered dataset '{name}' in {data_dir}")
+
+    def discover(self, root):
+        """
+        Registers root as the default dataset and every subdirectory of root
+        holding a movies.csv as a dataset named after the directory.
+        """
+        root = Path(root)
+        self.register(DEFAULT_DATASET, root)
+        if root.is_dir():
+            for directory in sorted(root.iterdir()):
+                if directory.is_dir() and not directory.name.startswith(".") and (directory / "movies.csv").exists():
+                    self.register(directory.name, directory)
+        return self
+
+    @property
+    def names(self):
+        """
+        Names of the registered datasets, the default first.
+        """
+        return sorted(self._data_dirs, key=lambda name: (name != DEFAULT_DATASET, name))
+
+    @property
+    def loaded(self):
+        """
+        Names of the loaded datasets, least recently used first.
+        """
+        return list(self._resident)
+
+    def memory_bytes(self):
+        """
+        Estimated memory held by the loaded datasets.
+        """
+        return sum(store.memory_bytes for store in list(self._resident.values()))
+
+    def store(self, name=None):
+        """
+        Returns the SnapshotStore of a dataset (the default when name is
+        None) with its data loaded, marking it as most recently used.
+
+        Other datasets are evicted to fit the budget once this one's frames
+        are loaded, so its memory is counted.
+        """
+        name = DEFAULT_DATASET if name is None else name
+        if name not in self._data_dirs:
+            raise ValueError(f"Unknown dataset {name!r}, expected one of {self.names}")
+        with self._lock:
+            store = self._resident.get(name)
+            if store is None:
+                data_dir = self._data_dirs[name]
+                # Only datasets that ship the movie metadata can train the revenue model
+                store = SnapshotStore(
+                    lambda: self._factory(data_dir),
+                    include_ml=(data_dir / "movies_metadata.csv").exists(),
+                )
+                self._resident[name] = store
+                if self._watch_interval is not None:
+                    store.start_watching(self._watch_interval)
+                logger.info(f"Loading dataset '{name}' from {data_dir}")
+            self._resident.move_to_end(name)
+        # Read the frames, the bulk of a dataset's memory, before evicting others so
+        # they are counted; outside the registry lock, so other datasets stay available
+        store.current.frames
+        self._evict(keep=name)
+        return store
+
+    def acquire(self, name=None):
+        """
+        Pins the current snapshot of a dataset, loading it if needed.
+
+        The snapshot is pinned under the registry lock while its store is
+        still resident, so a dataset evicted in the meantime is resolved
+        again instead of being reloaded behind the registry's back.
+
+        Returns:
+            tuple: The SnapshotStore and the pinned snapshot; hand the
+            snapshot back with store.release().
+        """
+        name = DEFAULT_DATASET if name is None else name
+        while True:
+            store = self.store(name)
+            with self._lock:
+                if self._resident.get(name) is store:
+                    return store, store.acquire()
+            logger.debug(f"Dataset '{name}' was evicted while loading, resolving it again")
+
+    def _evict(self, keep):
+        budget = self.memory_budget_mb * 2**20
+        while True:
+            with self._lock:
+                if self.memory_bytes() <= budget:
+                    return
+                # Datasets still loading hold nothing yet; evicting them frees nothing
+                victims = [name for name, store in self._resident.items() if name != keep and store.memory_bytes]
+                if not victims:
+                    return
+                name = victims[0]
+                store = self._resident.pop(name)
+            logger.info(
+                f"Evicting dataset '{name}' ({store.memory_bytes / 2**20:.1f} MB) "
+                f"to stay within {self.memory_budget_mb} MB"
+            )
+            store.unload()
+
+    def start_watching(self, interval=DEFAULT_RELOAD_INTERVAL):
+        """
+        Reloads every loaded dataset when its source files change (see
+        SnapshotStore.start_watching).
+        """
+        with self._lock:
+            self._watch_interval = interval
+            stores = list(self._resident.values())
+        for store in stores:
+            store.start_watching(interval)
+
+    def stop_watching(self):
+        with self._lock:
+            self._watch_interval = None
+            stores = list(self._resident.values())
+        for store in stores:
+            store.stop_watching()
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Upper bound on the points sent to the browser per trace
+DEFAULT_MAX_POINTS = 500
+
+
+def lttb(x, y, n_out):
+    """
+    Downsamples a series with Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last point and, from each of n_out - 2 equal-sized
+    buckets in between, the point forming the largest triangle with the
+    point kept from the previous bucket and the mean of the next bucket.
+    This preserves peaks and the overall shape of a line far better than
+    taking every k-th point.
+
+    Args:
+        x (ndarray): Increasing x values (numbers or datetime64).
+        y (ndarray): y values.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        ndarray: Indices of the kept points, increasing.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    xs = np.asarray(x)
+    if xs.dtype.kind == "M":
+        xs = xs.astype(np.int64)
+    xs = xs.astype(np.float64)
+    ys = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the points strictly between the first and last one
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Mean of the next bucket (the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = xs[next_start:max(next_end, next_start + 1)].mean()
+        next_y = ys[next_start:max(next_end, next_start + 1)].mean()
+        area = np.abs(
+            (xs[previous] - next_x) * (ys[start:end] - ys[previous])
+            - (xs[previous] - xs[start:end]) * (next_y - ys[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+
+def downsample(frame, x, y, max_points=DEFAULT_MAX_POINTS):
+    """
+    Returns the rows of frame kept by lttb() on the x and y columns.
+    """
+    if len(frame) <= max_points:
+        return frame
+    return frame.iloc[lttb(frame[x].to_numpy(), frame[y].to_numpy(), max_points)]
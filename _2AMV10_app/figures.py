@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_COLOR = "#FF0000"  # Red for the selected movie's genres
+DEFAULT_COLOR = "#636EFA"  # Default Plotly blue
+
+
+class FigureCache:
+    """
+    Server-side cache of base figures as plain Plotly dicts.
+
+    A figure is built once per key from a source object (for example the
+    context's ChartAggregates) and rebuilt only when a different source is
+    passed, so callbacks can start from the cached dict and apply the
+    selection on top instead of running plotly express on every request.
+    """
+
+    def __init__(self):
+        self._figures = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, source, builder):
+        """
+        Returns the cached figure for key, building it with builder(source)
+        if it is missing or was built from another source.
+        """
+        entry = self._figures.get(key)
+        if entry is not None and entry[0] is source:
+            return entry[1]
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is None or entry[0] is not source:
+                start = time.perf_counter()
+                entry = (source, builder(source).to_plotly_json())
+                self._figures[key] = entry
+                logger.debug(f"Built base figure '{key}' in {time.perf_counter() - start:.3f}s")
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+def bar_colors(categories, highlighted):
+    """
+    Bar colors that highlight the given categories.
+    """
+    return np.where(np.isin(categories, list(highlighted)), HIGHLIGHT_COLOR, DEFAULT_COLOR).tolist()
+
+
+def vline(x, text):
+    """
+    Shape and annotation of a dashed red vertical line, as fig.add_vline()
+    with annotation_position="top right" would add them.
+    """
+    shape = {
+        "type": "line", "x0": x, "x1": x, "xref": "x", "y0": 0, "y1": 1, "yref": "y domain",
+        "line": {"color": "red", "dash": "dash"},
+    }
+    annotation = {
+        "text": text, "showarrow": False, "x": x, "xref": "x", "xanchor": "left",
+        "y": 1, "yref": "y domain", "yanchor": "top",
+    }
+    return shape, annotation
+
+
+def with_bar_colors(figure, colors):
+    """
+    Copy of a cached figure dict with new colors for its first trace.
+
+    Only the containers on the path to the colors are copied; the cached
+    figure itself is never modified.
+    """
+    trace = figure["data"][0]
+    data = [{**trace, "marker": {**trace.get("marker", {}), "color": colors}}] + list(figure["data"][1:])
+    return {**figure, "data": data}
+
+
+def with_vlines(figure, lines):
+    """
+    Copy of a cached figure dict with the given (shape, annotation) pairs.
+    """
+    layout = {**figure["layout"], "shapes": [s for s, _ in lines], "annotations": [a for _, a in lines]}
+    return {**figure, "layout": layout}
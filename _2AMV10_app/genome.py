@@ -0,0 +1,134 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .cache import staged_directory
+
+logger = logging.getLogger(__name__)
+
+GENOME_DTYPES = {"movieId": "int32", "tagId": "int32", "relevance": "float32"}
+
+
+class GenomeMatrix:
+    """
+    Tag genome relevance scores as a dense movie x tag float32 matrix.
+
+    The matrix is built once from the long-format genome-scores.csv and
+    memory-mapped from disk, so every worker process shares the same pages
+    through the OS page cache instead of holding its own copy.
+    """
+
+    def __init__(self, scores, movie_ids, tag_ids, norms, tag_names=None):
+        self.scores = scores
+        self.movie_ids = movie_ids
+        self.tag_ids = tag_ids
+        self.norms = norms
+        self.tag_names = tag_names
+        self._rows = {int(movie_id): i for i, movie_id in enumerate(movie_ids)}
+
+    @staticmethod
+    def build(csv_path, directory, fingerprint=None, chunk_rows=5_000_000):
+        """
+        Converts genome-scores.csv into matrix files in directory.
+
+        The CSV is read twice in chunks: once to collect the movie and tag
+        ids, once to scatter the scores into a memory-mapped matrix, so the
+        long-format table is never fully loaded.
+        """
+        start = time.perf_counter()
+
+        movie_ids, tag_ids = set(), set()
+        for chunk in pd.read_csv(csv_path, dtype=GENOME_DTYPES, usecols=["movieId", "tagId"], chunksize=chunk_rows):
+            movie_ids.update(chunk["movieId"].unique().tolist())
+            tag_ids.update(chunk["tagId"].unique().tolist())
+        movie_ids = np.array(sorted(movie_ids), dtype=np.int32)
+        tag_ids = np.array(sorted(tag_ids), dtype=np.int32)
+
+        # Built next to directory and moved into place when complete, so a
+        # matrix other workers have memory-mapped is never truncated
+        with staged_directory(directory) as tmp_dir:
+            scores = np.lib.format.open_memmap(
+                tmp_dir / "scores.npy", mode="w+", dtype=np.float32, shape=(len(movie_ids), len(tag_ids))
+            )
+            for chunk in pd.read_csv(csv_path, dtype=GENOME_DTYPES, chunksize=chunk_rows):
+                rows = np.searchsorted(movie_ids, chunk["movieId"].to_numpy())
+                cols = np.searchsorted(tag_ids, chunk["tagId"].to_numpy())
+                scores[rows, cols] = chunk["relevance"].to_numpy()
+            scores.flush()
+            shape = scores.shape
+
+            np.save(tmp_dir / "movie_ids.npy", movie_ids)
+            np.save(tmp_dir / "tag_ids.npy", tag_ids)
+            np.save(tmp_dir / "norms.npy", np.linalg.norm(scores, axis=1).astype(np.float32))
+            # Written last so a partially built matrix is never picked up
+            (tmp_dir / "manifest.json").write_text(json.dumps({"fingerprint": fingerprint}))
+            del scores
+        logger.info(f"Built {shape} genome matrix in {time.perf_counter() - start:.2f}s")
+
+    @classmethod
+    def load(cls, directory, fingerprint=None, genome_tags=None):
+        """
+        Memory-maps a built matrix, or returns None if it is missing or stale.
+
+        Args:
+            genome_tags (DataFrame): Optional tagId/tag table to name the tags.
+        """
+        directory = Path(directory)
+        manifest_path = directory / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        if json.loads(manifest_path.read_text()).get("fingerprint") != fingerprint:
+            return None
+        tag_ids = np.load(directory / "tag_ids.npy")
+        tag_names = None
+        if genome_tags is not None:
+            names = genome_tags.set_index("tagId")["tag"]
+            tag_names = names.reindex(tag_ids).astype(str).to_numpy()
+        return cls(
+            np.load(directory / "scores.npy", mmap_mode="r"),
+            np.load(directory / "movie_ids.npy"),
+            tag_ids,
+            np.load(directory / "norms.npy"),
+            tag_names,
+        )
+
+    @property
+    def nbytes(self):
+        return int(self.scores.nbytes + self.movie_ids.nbytes + self.tag_ids.nbytes + self.norms.nbytes)
+
+    def __contains__(self, movie_id):
+        return int(movie_id) in self._rows
+
+    def top_tags(self, movie_id, n=10):
+        """
+        Most relevant tags of a movie.
+
+        Returns:
+            DataFrame: tagId, tag (if names are known) and relevance, best first.
+        """
+        row = self.scores[self._rows[int(movie_id)]]
+        best = np.argpartition(row, -n)[-n:] if n < len(row) else np.arange(len(row))
+        best = best[np.argsort(row[best])[::-1]]
+        result = pd.DataFrame({"tagId": self.tag_ids[best], "relevance": row[best]})
+        if self.tag_names is not None:
+            result.insert(1, "tag", self.tag_names[best])
+        return result
+
+    def similar_movies(self, movie_id, n=10):
+        """
+        Movies with the most similar tag profile (cosine similarity).
+
+        Returns:
+            DataFrame: movieId and similarity, most similar first, without the movie itself.
+        """
+        i = self._rows[int(movie_id)]
+        similarity = (self.scores @ self.scores[i]) / np.maximum(self.norms * self.norms[i], 1e-12)
+        similarity[i] = -np.inf
+        n = min(n, len(similarity) - 1)
+        best = np.argpartition(similarity, -n)[-n:]
+        best = best[np.argsort(similarity[best])[::-1]]
+        return pd.DataFrame({"movieId": self.movie_ids[best], "similarity": similarity[best]})
@@ -0,0 +1,110 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Fixed genre vocabulary; bit i of a genre mask is set when a movie has GENRES[i].
+# Kept in alphabetical order so decoded lists match the MovieLens "A|B|C" order.
+GENRES = [
+    "(no genres listed)", "Action", "Adventure", "Animation", "Children", "Comedy",
+    "Crime", "Documentary", "Drama", "Fantasy", "Film-Noir", "Horror", "IMAX",
+    "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western",
+]
+
+GENRE_BITS = {genre: np.uint32(1 << i) for i, genre in enumerate(GENRES)}
+
+
+def genre_mask(genres):
+    """
+    Returns the bitmask of a list of genre names.
+    """
+    mask = np.uint32(0)
+    for genre in genres:
+        if genre in GENRE_BITS:
+            mask |= GENRE_BITS[genre]
+    return mask
+
+
+def encode_genres(genres):
+    """
+    Encodes "A|B|C" genre strings into uint32 bitmasks.
+
+    Only the distinct genre strings (a few hundred combinations) are split,
+    every movie then gets its mask by a vectorized lookup.
+
+    Args:
+        genres (Series): Pipe-separated genre strings, one per movie.
+
+    Returns:
+        ndarray: uint32 mask per movie.
+    """
+    codes, uniques = pd.factorize(pd.Series(genres).astype(str))
+    unknown = {g for value in uniques for g in value.split("|")} - set(GENRE_BITS) - {"nan"}
+    if unknown:
+        logger.warning(f"Ignoring genres outside the vocabulary: {sorted(unknown)}")
+    masks = np.array([genre_mask(value.split("|")) for value in uniques], dtype=np.uint32)
+    return np.where(codes >= 0, masks[np.maximum(codes, 0)], 0).astype(np.uint32)
+
+
+def decode_genres(mask):
+    """
+    Returns the genre names of a single bitmask.
+    """
+    return [genre for genre, bit in GENRE_BITS.items() if int(mask) & int(bit)]
+
+
+def has_genre(masks, genre):
+    """
+    Boolean array telling which masks include genre.
+    """
+    return (np.asarray(masks) & GENRE_BITS[genre]) != 0
+
+
+def one_hot(masks, genres=GENRES):
+    """
+    Expands bitmasks into a (n_movies x len(genres)) uint8 one-hot matrix.
+    """
+    bits = np.array([GENRE_BITS[genre] for genre in genres], dtype=np.uint32)
+    return ((np.asarray(masks, dtype=np.uint32)[:, None] & bits) != 0).astype(np.uint8)
+
+
+def explode_genres(masks):
+    """
+    Lists every (movie, genre) pair set in the masks.
+
+    Returns:
+        tuple: row positions and genre indices into GENRES, one entry per pair.
+    """
+    return np.nonzero(one_hot(masks))
+
+
+def aggregate_by_genre(masks, values):
+    """
+    Sums per-movie values over the movies of every genre.
+
+    Returns:
+        ndarray: One total per genre in GENRES.
+    """
+    return one_hot(masks).T.astype(np.float64) @ np.asarray(values, dtype=np.float64)
+
+
+def genre_rating_stats(movies, aggregates):
+    """
+    Average rating and number of ratings per genre over all ratings.
+
+    Args:
+        movies (DataFrame): Movies with movieId and genre_mask.
+        aggregates (RatingAggregates): Per-movie rating sums and counts.
+
+    Returns:
+        DataFrame: genres, rating (mean) and count for every genre with ratings.
+    """
+    pos = aggregates.positions(movies["movieId"].to_numpy())
+    rated = pos >= 0
+    masks = movies["genre_mask"].to_numpy()[rated]
+    sums = aggregate_by_genre(masks, aggregates.rating_sum[pos[rated]])
+    counts = aggregate_by_genre(masks, aggregates.rating_count[pos[rated]])
+    stats = pd.DataFrame({"genres": GENRES, "rating": sums / np.maximum(counts, 1), "count": counts.astype(np.int64)})
+    return stats[stats["count"] > 0].reset_index(drop=True)
@@ -0,0 +1,108 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from .ingest import N_RATING_BINS
+from .ratings_index import RATING_VALUES
+
+logger = logging.getLogger(__name__)
+
+
+class RatingHistograms:
+    """
+    Number of ratings per half-star value of every movie.
+
+    An (n_movies x 10) int32 matrix whose rows follow the movies frame, so
+    a MovieCatalog position selects a movie's row. Counts, means, medians
+    and percentiles are derived from the rows; ratings only take ten
+    values, so these are exact and never need the ratings themselves.
+    """
+
+    def __init__(self, counts):
+        """
+        Args:
+            counts (ndarray): (n_movies x N_RATING_BINS) rating counts, in
+                the row order of the movies frame.
+        """
+        self.counts = counts
+
+    @classmethod
+    def from_aggregates(cls, movie_ids, aggregates):
+        """
+        Builds the matrix from the per-movie histograms of RatingAggregates.
+
+        Args:
+            movie_ids (ndarray): movieId column of the movies frame.
+            aggregates (RatingAggregates): Per-movie rating aggregates.
+        """
+        start = time.perf_counter()
+        pos = aggregates.positions(movie_ids)
+        rated = pos >= 0
+        counts = np.zeros((len(movie_ids), N_RATING_BINS), dtype=np.int32)
+        counts[rated] = aggregates.histogram[pos[rated]]
+        logger.debug(f"Built rating histograms of {len(movie_ids)} movies in {time.perf_counter() - start:.4f}s")
+        return cls(counts)
+
+    def with_rows(self, rows, counts):
+        """
+        Copy of the matrix with the given rows replaced, e.g. after new ratings.
+        """
+        updated = self.counts.copy()
+        updated[rows] = counts
+        return RatingHistograms(updated)
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def nbytes(self):
+        return int(self.counts.nbytes)
+
+    def rating_count(self, rows=slice(None)):
+        """
+        Number of ratings of the movies at rows (all movies by default).
+        """
+        return self.counts[rows].sum(axis=-1, dtype=np.int64)
+
+    def average_rating(self, rows=slice(None)):
+        """
+        Mean rating of the movies at rows, NaN for movies without ratings.
+        """
+        counts = self.counts[rows]
+        n = counts.sum(axis=-1, dtype=np.int64)
+        return np.where(n > 0, (counts @ RATING_VALUES) / np.maximum(n, 1), np.nan)
+
+    def percentile(self, q, rows=slice(None)):
+        """
+        q-th percentile of the ratings of the movies at rows, NaN without ratings.
+
+        Interpolates linearly between ratings like np.percentile() over the
+        ratings of each movie.
+        """
+        cumulative = np.cumsum(self.counts[rows], axis=-1, dtype=np.int64)
+        n = cumulative[..., -1]
+        rank = np.maximum(n - 1, 0) * (q / 100)
+        lower = np.floor(rank)
+        low = self._value_at(cumulative, lower)
+        high = self._value_at(cumulative, np.minimum(lower + 1, np.maximum(n - 1, 0)))
+        return np.where(n > 0, low + (rank - lower) * (high - low), np.nan)
+
+    def median(self, rows=slice(None)):
+        return self.percentile(50, rows)
+
+    @staticmethod
+    def _value_at(cumulative, rank):
+        # Rating of the rank-th smallest rating: the first bin whose cumulative count exceeds rank
+        bins = (cumulative <= np.expand_dims(rank, -1)).sum(axis=-1)
+        return RATING_VALUES[np.minimum(bins, N_RATING_BINS - 1)]
+
+    def distribution(self, row):
+        """
+        Number of ratings per rating value of one movie, like
+        value_counts().sort_index() of its ratings.
+        """
+        counts = self.counts[row]
+        present = counts > 0
+        return pd.Series(counts[present], index=RATING_VALUES[present], name="count")
@@ -0,0 +1,135 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from .genres import GENRES, explode_genres
+
+logger = logging.getLogger(__name__)
+
+
+def _first_years(first_timestamps):
+    return pd.to_datetime(first_timestamps, unit="s").year.to_numpy(dtype=np.float64)
+
+
+class GenreTrendAccumulator:
+    """
+    Running sum and count of movie average ratings per (year, genre).
+
+    The genre trends table (see data.get_genre_data) is the mean over these
+    cells, so a movie whose rating changes only moves its own contribution
+    instead of requiring a regroup of every movie.
+    """
+
+    def __init__(self, contributions):
+        grouped = contributions.groupby(["year", "genre"])["average_rating"]
+        self.sums = grouped.sum()
+        self.counts = grouped.count()
+
+    def update(self, removed, added):
+        """
+        Replaces the contributions in removed by those in added.
+        """
+        delta = pd.concat([
+            removed.assign(average_rating=-removed["average_rating"], n=-1),
+            added.assign(n=1),
+        ])
+        grouped = delta.groupby(["year", "genre"])
+        self.sums = self.sums.add(grouped["average_rating"].sum(), fill_value=0)
+        self.counts = self.counts.add(grouped["n"].sum(), fill_value=0)
+        # Cells without movies left are dropped, like an empty group would be
+        keep = self.counts > 0
+        self.sums, self.counts = self.sums[keep], self.counts[keep]
+
+    def to_frame(self):
+        return (
+            (self.sums / self.counts)
+            .rename("avg_rating")
+            .reset_index()
+        )
+
+
+class IncrementalRatings:
+    """
+    Keeps the movie rating stats and the genre trends current as new
+    ratings arrive.
+
+    append() takes a batch of new rating rows (movieId, rating, timestamp)
+    and updates the per-movie aggregates, the average_rating and
+    rating_count columns of movies and the genre-by-year means in time
+    proportional to the batch rather than to the rating history.
+
+    Every append() replaces movies and aggregates instead of modifying
+    them: the movies frame shares all but its two rating columns with the
+    previous one, and only the per-movie aggregate arrays are copied. So
+    the objects it was created from or handed out before (e.g. to a
+    published snapshot) never change, at a cost proportional to the number
+    of movies rather than of ratings.
+    """
+
+    def __init__(self, movies, aggregates):
+        self.movies = movies
+        self.aggregates = aggregates
+        # Row of every movieId in the movies frame
+        self._rows = pd.Series(np.arange(len(movies)), index=movies["movieId"].to_numpy())
+        self._trends = GenreTrendAccumulator(self._contributions(movies["movieId"].to_numpy()))
+
+    def _contributions(self, movie_ids):
+        """
+        One row per (movie, genre) with the movie's first rating year and
+        average rating, for the movies in movie_ids that have ratings.
+        """
+        pos = self.aggregates.positions(movie_ids)
+        rated = pos >= 0
+        # Only rated movies are gathered; pos is -1 for the others
+        pos = pos[rated]
+        sums = self.aggregates.rating_sum[pos]
+        counts = self.aggregates.rating_count[pos]
+        masks = self.movies["genre_mask"].to_numpy()[self._rows[np.asarray(movie_ids)[rated]].to_numpy()]
+        years = _first_years(self.aggregates.first_timestamp[pos])
+        averages = sums / np.maximum(counts, 1)
+        rows, genre_idx = explode_genres(masks)
+        return pd.DataFrame({
+            "year": years[rows],
+            "genre": np.array(GENRES, dtype=object)[genre_idx],
+            "average_rating": averages[rows],
+        })
+
+    def append(self, batch):
+        """
+        Adds a batch of new ratings.
+
+        Returns:
+            ndarray: Rows of the movies frame whose rating stats changed.
+        """
+        start = time.perf_counter()
+        # Ratings of movies missing from movies.csv only count in the aggregates
+        movie_ids = np.unique(batch["movieId"].to_numpy())
+        movie_ids = movie_ids[np.isin(movie_ids, self._rows.index)]
+
+        removed = self._contributions(movie_ids)
+        self.aggregates = self.aggregates.copy().add_batch(batch)
+        added = self._contributions(movie_ids)
+        self._trends.update(removed, added)
+
+        # Refresh the rating columns of the affected movies in new column arrays
+        pos = self.aggregates.positions(movie_ids)
+        rows = self._rows[movie_ids].to_numpy()
+        counts = self.aggregates.rating_count[pos]
+        averages = self.aggregates.rating_sum[pos] / np.maximum(counts, 1)
+        movies = self.movies.copy(deep=False)
+        for column, values in (("average_rating", averages), ("rating_count", counts)):
+            updated = movies[column].to_numpy(copy=True)
+            updated[rows] = values.astype(updated.dtype)
+            movies[column] = updated
+        self.movies = movies
+
+        logger.debug(f"Appended {len(batch)} ratings of {len(movie_ids)} movies in {time.perf_counter() - start:.4f}s")
+        return rows
+
+    def genre_trends(self):
+        """
+        Average rating per genre per year, like data.get_genre_data.
+        """
+        return self._trends.to_frame()
@@ -0,0 +1,287 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Default peak memory for streaming ingestion of ratings.csv
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+# Rough peak bytes per ratings row while a chunk is parsed and aggregated
+# (CSV text buffers, the parsed columns and the temporary group codes)
+_BYTES_PER_ROW = 128
+
+# Number of half-star rating values (0.5 to 5.0)
+N_RATING_BINS = 10
+
+RATINGS_DTYPES = {"userId": "int32", "movieId": "int32", "rating": "float32", "timestamp": "int64"}
+
+
+def rating_bins(ratings):
+    """
+    Maps ratings 0.5, 1.0, ..., 5.0 to histogram bins 0 to 9.
+    """
+    return np.rint(np.asarray(ratings) * 2).astype(np.int64) - 1
+
+
+class DailyTotals:
+    """
+    Mergeable rating sum and count per calendar day (UTC) over all movies.
+
+    Days are stored as days since 1 January 1970. Weekly, monthly and
+    yearly totals are sums over these.
+    """
+
+    def __init__(self, days, rating_sum, rating_count):
+        self.days = days
+        self.rating_sum = rating_sum
+        self.rating_count = rating_count
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_chunk(cls, chunk):
+        """
+        Totals a DataFrame of ratings (rating, timestamp) per day.
+        """
+        if chunk.empty:
+            return cls.empty()
+        days = chunk["timestamp"].to_numpy(dtype=np.int64) // 86400
+        codes, keys = pd.factorize(days, sort=True)
+        return cls(
+            keys.astype(np.int64),
+            np.bincount(codes, weights=chunk["rating"].to_numpy()),
+            np.bincount(codes).astype(np.int64),
+        )
+
+    @classmethod
+    def from_frame(cls, frame):
+        days = frame["day"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        return cls(days, frame["rating_sum"].to_numpy(dtype=np.float64), frame["rating_count"].to_numpy(dtype=np.int64))
+
+    def merge(self, other):
+        days = np.union1d(self.days, other.days)
+        merged = DailyTotals(days, np.zeros(len(days)), np.zeros(len(days), dtype=np.int64))
+        for part in (self, other):
+            pos = np.searchsorted(days, part.days)
+            merged.rating_sum[pos] += part.rating_sum
+            merged.rating_count[pos] += part.rating_count
+        return merged
+
+    def copy(self):
+        return DailyTotals(self.days.copy(), self.rating_sum.copy(), self.rating_count.copy())
+
+    def to_frame(self):
+        """
+        Returns one row per day (as a timestamp at midnight) with the totals.
+        """
+        return pd.DataFrame({
+            "day": self.days.astype("datetime64[D]").astype("datetime64[ns]"),
+            "rating_sum": self.rating_sum,
+            "rating_count": self.rating_count,
+        })
+
+
+class RatingAggregates:
+    """
+    Mergeable per-movie rating aggregates.
+
+    Holds the rating sum, count, first and last timestamp and the rating
+    histogram of every movie, sorted by movieId, plus the rating totals per
+    day over all movies. Aggregates of two chunks merge into the
+    aggregates of both, so ratings.csv can be processed one chunk at a time
+    in a single pass.
+    """
+
+    def __init__(self, movie_ids, rating_sum, rating_count, first_timestamp, last_timestamp, histogram,
+                 daily=None):
+        self.movie_ids = movie_ids
+        self.rating_sum = rating_sum
+        self.rating_count = rating_count
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
+        self.histogram = histogram
+        self.daily = daily if daily is not None else DailyTotals.empty()
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty((0, N_RATING_BINS), dtype=np.int64),
+        )
+
+    @classmethod
+    def from_chunk(cls, chunk):
+        """
+        Aggregates a DataFrame of ratings (movieId, rating, timestamp).
+        """
+        if chunk.empty:
+            return cls.empty()
+        codes, movie_ids = pd.factorize(chunk["movieId"].to_numpy(), sort=True)
+        n = len(movie_ids)
+        ratings = chunk["rating"].to_numpy()
+        timestamps = pd.Series(chunk["timestamp"].to_numpy(dtype=np.int64))
+        histogram = np.bincount(
+            codes * N_RATING_BINS + rating_bins(ratings), minlength=n * N_RATING_BINS
+        ).reshape(n, N_RATING_BINS)
+        return cls(
+            movie_ids.astype(np.int64),
+            np.bincount(codes, weights=ratings, minlength=n),
+            np.bincount(codes, minlength=n).astype(np.int64),
+            timestamps.groupby(codes).min().to_numpy(),
+            timestamps.groupby(codes).max().to_numpy(),
+            histogram.astype(np.int64),
+            DailyTotals.from_chunk(chunk),
+        )
+
+    @classmethod
+    def from_frame(cls, stats, days=None):
+        """
+        Rebuilds the aggregates from the frames written by to_frame() and
+        daily.to_frame().
+        """
+        hist_columns = [f"hist_{i}" for i in range(N_RATING_BINS)]
+        return cls(
+            stats["movieId"].to_numpy(dtype=np.int64),
+            stats["rating_sum"].to_numpy(dtype=np.float64),
+            stats["rating_count"].to_numpy(dtype=np.int64),
+            stats["first_timestamp"].to_numpy(dtype=np.int64),
+            stats["last_timestamp"].to_numpy(dtype=np.int64),
+            stats[hist_columns].to_numpy(dtype=np.int64),
+            DailyTotals.from_frame(days) if days is not None else None,
+        )
+
+    def merge(self, other):
+        """
+        Returns the aggregates of the ratings in self and other combined.
+        """
+        movie_ids = np.union1d(self.movie_ids, other.movie_ids)
+        n = len(movie_ids)
+        merged = RatingAggregates(
+            movie_ids,
+            np.zeros(n, dtype=np.float64),
+            np.zeros(n, dtype=np.int64),
+            np.full(n, np.iinfo(np.int64).max, dtype=np.int64),
+            np.full(n, np.iinfo(np.int64).min, dtype=np.int64),
+            np.zeros((n, N_RATING_BINS), dtype=np.int64),
+            self.daily.merge(other.daily),
+        )
+        for part in (self, other):
+            pos = np.searchsorted(movie_ids, part.movie_ids)
+            merged.rating_sum[pos] += part.rating_sum
+            merged.rating_count[pos] += part.rating_count
+            merged.first_timestamp[pos] = np.minimum(merged.first_timestamp[pos], part.first_timestamp)
+            merged.last_timestamp[pos] = np.maximum(merged.last_timestamp[pos], part.last_timestamp)
+            merged.histogram[pos] += part.histogram
+        return merged
+
+    def copy(self):
+        """
+        Returns an independent copy, e.g. to update without touching a published snapshot.
+        """
+        return RatingAggregates(
+            self.movie_ids.copy(), self.rating_sum.copy(), self.rating_count.copy(),
+            self.first_timestamp.copy(), self.last_timestamp.copy(), self.histogram.copy(),
+            self.daily.copy(),
+        )
+
+    def positions(self, movie_ids):
+        """
+        Returns the rows of movie_ids in these aggregates, -1 for unknown movies.
+        """
+        movie_ids = np.asarray(movie_ids)
+        if len(self.movie_ids) == 0:
+            return np.full(len(movie_ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.movie_ids, movie_ids), len(self.movie_ids) - 1)
+        return np.where(self.movie_ids[pos] == movie_ids, pos, -1)
+
+    def add_batch(self, batch):
+        """
+        Adds a batch of new ratings and returns the updated aggregates.
+
+        Movies that already have ratings are updated in place, in time
+        proportional to the batch. Only a batch that introduces new movies
+        falls back to a full merge.
+        """
+        part = RatingAggregates.from_chunk(batch)
+        pos = self.positions(part.movie_ids)
+        if (pos < 0).any():
+            return self.merge(part)
+        self.daily = self.daily.merge(part.daily)
+        self.rating_sum[pos] += part.rating_sum
+        self.rating_count[pos] += part.rating_count
+        self.first_timestamp[pos] = np.minimum(self.first_timestamp[pos], part.first_timestamp)
+        self.last_timestamp[pos] = np.maximum(self.last_timestamp[pos], part.last_timestamp)
+        self.histogram[pos] += part.histogram
+        return self
+
+    @property
+    def nbytes(self):
+        return int(sum(a.nbytes for a in (
+            self.movie_ids, self.rating_sum, self.rating_count,
+            self.first_timestamp, self.last_timestamp, self.histogram,
+            self.daily.days, self.daily.rating_sum, self.daily.rating_count,
+        )))
+
+    def to_frame(self):
+        """
+        Returns one row per movie with the aggregates and the average rating.
+        """
+        stats = pd.DataFrame({
+            "movieId": self.movie_ids,
+            "rating_sum": self.rating_sum,
+            "rating_count": self.rating_count,
+            "average_rating": self.rating_sum / np.maximum(self.rating_count, 1),
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+        })
+        for i in range(N_RATING_BINS):
+            stats[f"hist_{i}"] = self.histogram[:, i]
+        return stats
+
+
+def chunk_rows_for_budget(memory_budget_mb):
+    """
+    Number of ratings rows per chunk that keeps parsing within the budget.
+    """
+    return max(10_000, int(memory_budget_mb * 2**20) // _BYTES_PER_ROW)
+
+
+def stream_ratings(path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, chunk_rows=None):
+    """
+    Yields ratings.csv in fixed-size chunks with compact column types.
+    """
+    chunk_rows = chunk_rows or chunk_rows_for_budget(memory_budget_mb)
+    with pd.read_csv(path, dtype=RATINGS_DTYPES, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def aggregate_ratings(path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, chunk_rows=None):
+    """
+    Builds the per-movie rating aggregates of ratings.csv in a single streaming pass.
+
+    Only one chunk and the running aggregates are held in memory, so files
+    much larger than RAM can be processed.
+
+    Returns:
+        RatingAggregates: The aggregates of every rating in the file.
+    """
+    start = time.perf_counter()
+    aggregates = RatingAggregates.empty()
+    rows = 0
+    for chunk in stream_ratings(path, memory_budget_mb, chunk_rows):
+        aggregates = aggregates.merge(RatingAggregates.from_chunk(chunk))
+        rows += len(chunk)
+    logger.info(
+        f"Aggregated {rows} ratings of {len(aggregates.movie_ids)} movies "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return aggregates
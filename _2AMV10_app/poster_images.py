@@ -0,0 +1,198 @@
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from flask import abort, send_file
+
+from .data import CACHE_DIR_NAME, DATA_DIR
+from .posters import get_poster_service
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; posters are then stored at full size
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Poster thumbnails stored on disk, shared by all datasets
+DEFAULT_POSTER_DIR = DATA_DIR / CACHE_DIR_NAME / "posters"
+
+# Width of the poster in the detail panel, in pixels
+POSTER_WIDTH = 300
+
+# Seconds browsers may reuse a poster before revalidating it
+POSTER_MAX_AGE = 7 * 24 * 3600
+
+# Poster downloads running at once for request()
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+# How often the detail panel checks for a requested poster, and for how long
+POSTER_POLL_INTERVAL_MS = 500
+POSTER_TIMEOUT = 10
+
+_IMDB_ID = re.compile(r"tt\d+")
+
+
+def poster_path(imdb_id):
+    """
+    URL path of the poster route for a movie (see register_poster_routes).
+    """
+    return f"/posters/{imdb_id}.jpg"
+
+
+class PosterImageStore:
+    """
+    Poster images downloaded once and kept on disk as thumbnails.
+
+    The poster URL comes from the PosterService; the image is downloaded
+    over its pooled session, downsized to width pixels wide when Pillow is
+    installed, and written atomically, so concurrent requests never see a
+    partial file. Concurrent first requests of one poster download it once.
+
+    get() blocks until the poster is on disk; request() starts the download
+    on a background pool and returns immediately, for callers that poll.
+    """
+
+    def __init__(self, service, directory=DEFAULT_POSTER_DIR, width=POSTER_WIDTH,
+                 max_workers=DEFAULT_DOWNLOAD_WORKERS):
+        self.service = service
+        self.directory = Path(directory)
+        self.width = width
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poster-download")
+        # Background downloads by imdbId, kept after a failure until retried
+        self._downloads = {}
+
+    def get(self, imdb_id):
+        """
+        Returns the path of the poster image of a movie, None if it has none
+        or it could not be downloaded.
+        """
+        return self._get(imdb_id)[0]
+
+    def has(self, imdb_id):
+        """
+        Whether the poster of a movie is already on disk.
+        """
+        return (self.directory / f"{imdb_id}.jpg").exists()
+
+    def request(self, imdb_id, retry=False):
+        """
+        Non-blocking get(): starts downloading the poster in the background.
+
+        Args:
+            retry (bool): Download again if an earlier attempt failed.
+
+        Returns:
+            tuple: (path, error) once the poster is on disk or has failed,
+            (None, None) while it is still downloading.
+        """
+        path = self.directory / f"{imdb_id}.jpg"
+        if path.exists():
+            return path, None
+        with self._locks_guard:
+            future = self._downloads.get(imdb_id)
+            if future is None or (retry and future.done()):
+                future = self._downloads[imdb_id] = self._pool.submit(self._get, imdb_id)
+        if not future.done():
+            return None, None
+        path, error = future.result()
+        if path is not None:
+            with self._locks_guard:
+                self._downloads.pop(imdb_id, None)
+        return path, error
+
+    def _get(self, imdb_id):
+        path = self.directory / f"{imdb_id}.jpg"
+        if path.exists():
+            return path, None
+        with self._locks_guard:
+            lock = self._locks.setdefault(imdb_id, threading.Lock())
+        with lock:
+            error = None if path.exists() else self._download(imdb_id, path)
+        with self._locks_guard:
+            self._locks.pop(imdb_id, None)
+        return (path, None) if error is None else (None, error)
+
+    def _download(self, imdb_id, path):
+        # Returns why the poster could not be stored, None on success
+        try:
+            poster_url = self.service.poster_url(imdb_id)
+        except ValueError as e:
+            # No API key configured
+            return str(e)
+        if poster_url.startswith("Error: "):
+            return poster_url[len("Error: "):]
+        if not poster_url.startswith("http"):
+            # OMDb's "N/A" for movies without a poster
+            return "No poster available"
+        try:
+            response = self.service.session.get(poster_url, timeout=self.service.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Downloading the poster of {imdb_id} failed: {e}")
+            return "Unable to download the poster"
+        try:
+            content = self._thumbnail(response.content)
+        except OSError as e:
+            logger.warning(f"Poster of {imdb_id} is not a readable image: {e}")
+            return "Unable to download the poster"
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+        logger.debug(f"Stored poster of {imdb_id} ({len(response.content)} -> {len(content)} bytes)")
+        return None
+
+    def _thumbnail(self, content):
+        if Image is None:
+            return content
+        with Image.open(io.BytesIO(content)) as image:
+            if image.width > self.width:
+                height = round(image.height * self.width / image.width)
+                image = image.resize((self.width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+        return buffer.getvalue()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_poster_image_store():
+    """
+    Returns the process-wide PosterImageStore, creating it on first use.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PosterImageStore(get_poster_service())
+    return _store
+
+
+def register_poster_routes(app):
+    """
+    Serves poster thumbnails from the app's own server at poster_path().
+
+    Responses carry an ETag and Cache-Control, so browsers reuse a poster
+    or revalidate it with a 304 instead of downloading it again.
+    """
+    @app.server.route(f"{app.config.routes_pathname_prefix}posters/<imdb_id>.jpg")
+    def serve_poster(imdb_id):
+        if not _IMDB_ID.fullmatch(imdb_id):
+            abort(404)
+        path = get_poster_image_store().get(imdb_id)
+        if path is None:
+            abort(404)
+        return send_file(path, mimetype="image/jpeg", etag=True, conditional=True, max_age=POSTER_MAX_AGE)
@@ -0,0 +1,177 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .data import CACHE_DIR_NAME, DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# OMDb endpoint; point OMDB_BASE_URL at a stub server for testing
+DEFAULT_OMDB_URL = "http://www.omdbapi.com/"
+
+# Poster lookups cached on disk, shared by all datasets
+DEFAULT_POSTER_CACHE = DATA_DIR / CACHE_DIR_NAME / "posters.sqlite"
+
+# Seconds a found poster URL and a "not found" answer stay valid
+DEFAULT_POSTER_TTL = 30 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+
+# Connect and read timeouts of an OMDb request, in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Connections kept open to OMDb
+DEFAULT_POOL_SIZE = 8
+
+
+class PosterCache:
+    """
+    Persistent imdbId -> poster URL cache in SQLite.
+
+    Besides poster URLs it stores OMDb's "not found" answers (negative
+    caching), which expire after their own, shorter TTL. The database is
+    shared by all threads of the process.
+    """
+
+    def __init__(self, path=DEFAULT_POSTER_CACHE, ttl=DEFAULT_POSTER_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS posters ("
+                "imdb_id TEXT PRIMARY KEY, poster_url TEXT, error TEXT, fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, imdb_id):
+        """
+        Returns the fresh cache entry of imdb_id as (poster_url, error), None on a miss.
+
+        Exactly one of poster_url and error is set.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT poster_url, error, fetched_at FROM posters WHERE imdb_id = ?", (imdb_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        poster_url, error, fetched_at = row
+        ttl = self.ttl if poster_url is not None else self.negative_ttl
+        if time.time() - fetched_at > ttl:
+            return None
+        return poster_url, error
+
+    def put(self, imdb_id, poster_url=None, error=None):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO posters (imdb_id, poster_url, error, fetched_at) VALUES (?, ?, ?, ?)",
+                (imdb_id, poster_url, error, time.time()),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM posters").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=2):
+    """
+    Returns a requests.Session with pooled connections and retries on
+    connection errors and 5xx/429 responses. Read timeouts are not retried,
+    so a slow API costs at most one read timeout.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, read=0, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class PosterService:
+    """
+    Looks up poster URLs on OMDb through a PosterCache.
+
+    Cache misses are fetched over one shared, pooled session with timeouts.
+    Only definite answers are cached: a poster URL, or OMDb reporting the
+    movie as unknown. Network errors, timeouts and error statuses such as
+    an exhausted quota are returned without caching, so they are retried
+    on the next lookup.
+    """
+
+    def __init__(self, cache, api_key=None, base_url=DEFAULT_OMDB_URL, timeout=DEFAULT_TIMEOUT, session=None):
+        self.cache = cache
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = session or create_session()
+
+    def poster_url(self, imdb_id):
+        """
+        Returns the poster URL of a movie, or a message starting with
+        "Error:" if there is none.
+        """
+        cached = self.cache.get(imdb_id)
+        if cached is not None:
+            poster_url, error = cached
+            return poster_url if poster_url is not None else f"Error: {error}"
+
+        if not self.api_key:
+            raise ValueError("OMDB_API_KEY not found in environment variables")
+        start = time.perf_counter()
+        try:
+            response = self.session.get(
+                self.base_url, params={"i": imdb_id, "apikey": self.api_key}, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            logger.warning(f"Poster lookup of {imdb_id} failed: {e}")
+            return f"Error: Unable to fetch data ({type(e).__name__})"
+        logger.debug(f"Fetched poster of {imdb_id} in {time.perf_counter() - start:.3f}s")
+
+        if response.status_code != 200:
+            return f"Error: Unable to fetch data (status code: {response.status_code})"
+        try:
+            data = response.json()
+        except ValueError:
+            return "Error: Unable to fetch data (invalid response)"
+        if data.get("Response") == "True":
+            poster_url = data.get("Poster", "No poster available")
+            self.cache.put(imdb_id, poster_url=poster_url)
+            return poster_url
+        error = data.get("Error", "Movie not found")
+        self.cache.put(imdb_id, error=error)
+        return f"Error: {error}"
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_poster_service():
+    """
+    Returns the process-wide PosterService, configured from OMDB_API_KEY and OMDB_BASE_URL.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PosterService(
+                    PosterCache(),
+                    api_key=os.getenv("OMDB_API_KEY"),
+                    base_url=os.getenv("OMDB_BASE_URL", DEFAULT_OMDB_URL),
+                )
+    return _service
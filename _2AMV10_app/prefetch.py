@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .poster_images import get_poster_image_store
+
+logger = logging.getLogger(__name__)
+
+# Concurrent poster downloads of the prefetcher
+DEFAULT_PREFETCH_WORKERS = 4
+
+# Posters per second the prefetcher may fetch, to spare the OMDb quota
+DEFAULT_PREFETCH_RATE = 5.0
+
+# Most-rated titles whose posters are fetched at startup
+DEFAULT_PREFETCH_MOST_RATED = 200
+
+
+class RateLimiter:
+    """
+    Spaces calls of wait() at least 1 / rate seconds apart across threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class PosterPrefetcher:
+    """
+    Downloads poster thumbnails in the background before they are shown.
+
+    Posters go through a PosterImageStore, so a movie picked from the
+    dropdown or the top-rated table finds its thumbnail already on disk.
+    Movies are queued on a channel, e.g. the dropdown options or the
+    visible top-rated page, and looked up by a bounded pool of workers
+    under a shared rate limit. Queueing on a channel supersedes what was
+    queued there before: lookups of the older generation that have not
+    started are dropped, so typing or paging quickly never builds up a
+    backlog of posters nobody looks at anymore. Movies whose thumbnail is
+    already on disk, or that are known to have no poster, cost neither a
+    request nor a rate-limit slot.
+    """
+
+    def __init__(self, images, max_workers=DEFAULT_PREFETCH_WORKERS, rate=DEFAULT_PREFETCH_RATE):
+        self.images = images
+        self.service = images.service
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poster-prefetch")
+        self._limiter = RateLimiter(rate)
+        # Latest generation per channel, and (channel, generation) of every queued movie
+        self._generations = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, imdb_ids, channel="default"):
+        """
+        Queues poster lookups of imdb_ids, superseding earlier work of channel.
+
+        Returns:
+            int: Number of movies newly queued.
+        """
+        if not self.service.api_key:
+            return 0
+        submit = []
+        with self._lock:
+            generation = self._generations.get(channel, 0) + 1
+            self._generations[channel] = generation
+            for imdb_id in dict.fromkeys(imdb_ids):
+                if not isinstance(imdb_id, str) or not imdb_id:
+                    continue
+                if imdb_id not in self._pending:
+                    submit.append(imdb_id)
+                # Movies still queued move to the new generation instead of being queued twice
+                self._pending[imdb_id] = (channel, generation)
+        for imdb_id in submit:
+            self._pool.submit(self._fetch, imdb_id)
+        return len(submit)
+
+    def warm_most_rated(self, catalog, n=DEFAULT_PREFETCH_MOST_RATED):
+        """
+        Queues the posters of the n most-rated movies of a MovieCatalog.
+        """
+        order = np.argsort(-catalog.rating_counts, kind="stable")[:n]
+        return self.prefetch(catalog.imdb_ids[order].tolist(), channel="most-rated")
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _check(self, imdb_id):
+        # The queue entry of the movie, and whether a newer generation superseded it
+        with self._lock:
+            entry = self._pending[imdb_id]
+            channel, generation = entry
+            return entry, self._generations[channel] != generation
+
+    def _no_poster(self, imdb_id):
+        # OMDb answered recently that the movie has no poster or does not exist
+        cached = self.service.cache.get(imdb_id)
+        return cached is not None and not (cached[0] or "").startswith("http")
+
+    def _fetch(self, imdb_id):
+        entry = None
+        try:
+            entry, stale = self._check(imdb_id)
+            if stale or self.images.has(imdb_id) or self._no_poster(imdb_id):
+                return
+            self._limiter.wait()
+            # The rate limit may have kept this download waiting long enough to go stale
+            entry, stale = self._check(imdb_id)
+            if stale:
+                return
+            self.images.get(imdb_id)
+        except Exception:
+            logger.exception(f"Prefetching the poster of {imdb_id} failed")
+        finally:
+            with self._lock:
+                requeued = entry is not None and self._pending.get(imdb_id) != entry
+                if not requeued:
+                    self._pending.pop(imdb_id, None)
+            if requeued:
+                # prefetch() queued the movie again after it was last checked, and did
+                # not submit it because it was still pending
+                self._pool.submit(self._fetch, imdb_id)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_poster_prefetcher():
+    """
+    Returns the process-wide PosterPrefetcher, creating it on first use.
+    """
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = PosterPrefetcher(get_poster_image_store())
+    return _prefetcher
@@ -0,0 +1,179 @@
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .cache import staged_directory
+from .ingest import DEFAULT_MEMORY_BUDGET_MB, RATINGS_DTYPES, stream_ratings
+
+logger = logging.getLogger(__name__)
+
+# Ratings are given in half stars from 0.5 to 5.0
+RATING_VALUES = np.arange(1, 11) / 2
+
+_COLUMNS = ["userId", "rating", "timestamp"]
+
+
+class RatingsIndex:
+    """
+    Ratings sorted by movieId with a CSR-style offsets array.
+
+    The ratings of the movie at position i of movie_ids are the rows
+    offsets[i]:offsets[i + 1] of every column, so looking up one movie is a
+    binary search plus a contiguous slice instead of a scan of all ratings.
+    The arrays can be saved to disk and memory-mapped back.
+    """
+
+    def __init__(self, movie_ids, offsets, columns):
+        self.movie_ids = movie_ids
+        self.offsets = offsets
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, ratings):
+        """
+        Builds the index from a ratings DataFrame (userId, movieId, rating, timestamp).
+        """
+        order = np.argsort(ratings["movieId"].to_numpy(), kind="stable")
+        sorted_ids = ratings["movieId"].to_numpy()[order]
+        movie_ids, counts = np.unique(sorted_ids, return_counts=True)
+        offsets = np.zeros(len(movie_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        columns = {name: ratings[name].to_numpy()[order] for name in _COLUMNS}
+        return cls(movie_ids, offsets, columns)
+
+    @classmethod
+    def from_csv(cls, path, aggregates, directory, fingerprint=None,
+                 memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        """
+        Builds the index straight from ratings.csv into memory-mapped files.
+
+        The per-movie counts in aggregates (see ingest.aggregate_ratings) give
+        the offsets up front, so a second streaming pass can scatter each
+        chunk into place without ever holding all ratings in memory.
+        """
+        movie_ids = aggregates.movie_ids
+        offsets = np.zeros(len(movie_ids) + 1, dtype=np.int64)
+        np.cumsum(aggregates.rating_count, out=offsets[1:])
+        with staged_directory(directory) as tmp_dir:
+            columns = {
+                name: np.lib.format.open_memmap(
+                    tmp_dir / f"{name}.npy", mode="w+", dtype=RATINGS_DTYPES[name], shape=(int(offsets[-1]),)
+                )
+                for name in _COLUMNS
+            }
+
+            # Next free row of every movie
+            cursor = offsets[:-1].copy()
+            for chunk in stream_ratings(path, memory_budget_mb):
+                codes = np.searchsorted(movie_ids, chunk["movieId"].to_numpy())
+                order = np.argsort(codes, kind="stable")
+                sorted_codes = codes[order]
+                # Rank of each row among the chunk's rows of the same movie
+                group_start = np.searchsorted(sorted_codes, sorted_codes)
+                rows = cursor[sorted_codes] + np.arange(len(sorted_codes)) - group_start
+                for name, values in columns.items():
+                    values[rows] = chunk[name].to_numpy()[order]
+                cursor += np.bincount(codes, minlength=len(movie_ids))
+
+            for values in columns.values():
+                values.flush()
+            cls(movie_ids, offsets, {})._write(tmp_dir, fingerprint)
+            # Close the files before the directory is moved into place
+            del columns, values
+        return cls.load(directory, fingerprint)
+
+    def save(self, directory, fingerprint=None):
+        """
+        Writes the arrays as .npy files so they can be memory-mapped by load().
+
+        The files are written to a temporary directory that then replaces
+        directory, so files another process has memory-mapped are never
+        truncated (see cache.staged_directory).
+        """
+        with staged_directory(directory) as tmp_dir:
+            self._write(tmp_dir, fingerprint)
+
+    def _write(self, directory, fingerprint):
+        directory = Path(directory)
+        np.save(directory / "movie_ids.npy", self.movie_ids)
+        np.save(directory / "offsets.npy", self.offsets)
+        for name, values in self.columns.items():
+            np.save(directory / f"{name}.npy", values)
+        # Written last so a partially saved index is never picked up
+        (directory / "manifest.json").write_text(json.dumps({"fingerprint": fingerprint}))
+
+    @classmethod
+    def load(cls, directory, fingerprint=None, mmap=True):
+        """
+        Loads a saved index, or returns None if it is missing or stale.
+
+        With mmap=True the arrays are memory-mapped read-only, so they are
+        paged in on demand and shared between processes through the page cache.
+        """
+        directory = Path(directory)
+        manifest_path = directory / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        if json.loads(manifest_path.read_text()).get("fingerprint") != fingerprint:
+            return None
+        mmap_mode = "r" if mmap else None
+        try:
+            movie_ids = np.load(directory / "movie_ids.npy", mmap_mode=mmap_mode)
+            offsets = np.load(directory / "offsets.npy", mmap_mode=mmap_mode)
+            columns = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in _COLUMNS}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load ratings index: {e}")
+            return None
+        return cls(movie_ids, offsets, columns)
+
+    @property
+    def nbytes(self):
+        return int(self.movie_ids.nbytes + self.offsets.nbytes + sum(v.nbytes for v in self.columns.values()))
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def bounds(self, movie_id):
+        """
+        Returns the (start, end) rows of a movie, (0, 0) if it has no ratings.
+        """
+        pos = np.searchsorted(self.movie_ids, movie_id)
+        if pos == len(self.movie_ids) or self.movie_ids[pos] != movie_id:
+            return 0, 0
+        return int(self.offsets[pos]), int(self.offsets[pos + 1])
+
+    def ratings_for(self, movie_id):
+        start, end = self.bounds(movie_id)
+        return self.columns["rating"][start:end]
+
+    def timestamps_for(self, movie_id):
+        start, end = self.bounds(movie_id)
+        return self.columns["timestamp"][start:end]
+
+    def slice(self, movie_id):
+        """
+        Returns the ratings of one movie as a DataFrame.
+        """
+        start, end = self.bounds(movie_id)
+        frame = pd.DataFrame({name: values[start:end] for name, values in self.columns.items()})
+        frame.insert(1, "movieId", movie_id)
+        return frame
+
+    def histogram(self, movie_id):
+        """
+        Number of ratings per rating value, like value_counts().sort_index().
+        """
+        bins = np.rint(self.ratings_for(movie_id) * 2).astype(np.int64) - 1
+        counts = np.bincount(bins, minlength=len(RATING_VALUES))
+        present = counts > 0
+        return pd.Series(counts[present], index=RATING_VALUES[present], name="count")
+
+    def first_timestamp(self, movie_id):
+        """
+        Earliest rating timestamp of a movie, None if it has no ratings.
+        """
+        timestamps = self.timestamps_for(movie_id)
+        return int(timestamps.min()) if len(timestamps) else None
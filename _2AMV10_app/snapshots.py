@@ -0,0 +1,261 @@
+import logging
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from .incremental import IncrementalRatings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the source files for changes
+DEFAULT_RELOAD_INTERVAL = 30.0
+
+
+class SnapshotStore:
+    """
+    Publishes versioned, read-only DataContext snapshots.
+
+    Readers pin the current snapshot with acquire() and hand it back with
+    release(). reload() and append_ratings() never touch a published
+    snapshot: they build a new one and swap it in atomically, so requests
+    in flight keep reading the version they started with. A replaced
+    snapshot is disposed of once its last reader releases it, including its
+    on-disk cache directories that no live snapshot still uses.
+
+    unload() drops the data altogether to free its memory; the next access
+    to current loads it again.
+    """
+
+    def __init__(self, factory, include_ml=True):
+        """
+        Args:
+            factory (callable): Returns a new DataContext read from the files on disk.
+            include_ml (bool): Also train the revenue model before publishing a reload.
+        """
+        self._factory = factory
+        self.include_ml = include_ml
+        self._current = None
+        self._version = 0
+        # Readers per snapshot and replaced snapshots that still have readers
+        self._readers = {}
+        self._retired = []
+        # Snapshots whose cache directories outlive them (see unload)
+        self._keep_cache = set()
+        self._lock = threading.Lock()
+        # Serializes the builds of new snapshots
+        self._update_lock = threading.Lock()
+        self._incremental = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    @property
+    def current(self):
+        """
+        The latest published snapshot, created on first use.
+        """
+        if self._current is None:
+            with self._update_lock:
+                if self._current is None:
+                    self.publish(self._factory())
+        return self._current
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def memory_bytes(self):
+        """
+        Estimated memory held by the current snapshot, 0 when none is loaded.
+        """
+        snapshot = self._current
+        return 0 if snapshot is None else snapshot.memory_bytes
+
+    def acquire(self):
+        """
+        Pins and returns the current snapshot; pair with release().
+        """
+        self.current
+        with self._lock:
+            snapshot = self._current
+            self._readers[snapshot] = self._readers.get(snapshot, 0) + 1
+        return snapshot
+
+    def release(self, snapshot):
+        with self._lock:
+            self._readers[snapshot] -= 1
+            if self._readers[snapshot]:
+                return
+            del self._readers[snapshot]
+            if snapshot in self._retired:
+                self._retired.remove(snapshot)
+                self._dispose(snapshot)
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Pins the current snapshot for the duration of a with block.
+        """
+        snapshot = self.acquire()
+        try:
+            yield snapshot
+        finally:
+            self.release(snapshot)
+
+    def publish(self, snapshot):
+        """
+        Makes snapshot the current one and retires the previous snapshot.
+        """
+        with self._lock:
+            self._version += 1
+            snapshot.version = self._version
+            previous, self._current = self._current, snapshot
+            self._retire(previous)
+        logger.info(f"Published data snapshot v{snapshot.version}")
+
+    def unload(self):
+        """
+        Drops the current snapshot to free its memory, keeping its on-disk
+        caches for the next load. Readers still holding it keep reading it
+        until they release it.
+        """
+        # Only signals the watcher: unload() may run on a request thread
+        self.stop_watching(wait=False)
+        with self._update_lock:
+            with self._lock:
+                previous, self._current = self._current, None
+                self._keep_cache.update(s for s in (previous, *self._retired) if s is not None)
+                self._incremental = None
+                self._retire(previous)
+
+    def _retire(self, snapshot):
+        # Caller holds self._lock
+        if snapshot is None:
+            return
+        if self._readers.get(snapshot):
+            self._retired.append(snapshot)
+        else:
+            self._dispose(snapshot)
+
+    def _dispose(self, snapshot):
+        # Caller holds self._lock
+        if snapshot in self._keep_cache:
+            self._keep_cache.discard(snapshot)
+        else:
+            live = [s for s in (self._current, *self._retired) if s is not None]
+            in_use = set().union(*(s.cache_dirs for s in live))
+            for directory in snapshot.cache_dirs - in_use:
+                shutil.rmtree(directory, ignore_errors=True)
+                logger.debug(f"Removed stale cache directory {directory}")
+        snapshot.close()
+        logger.info(f"Released data snapshot v{snapshot.version}")
+
+    def reload(self, force=False):
+        """
+        Builds a snapshot from the files on disk and publishes it.
+
+        Unless force is set, nothing happens when the source files did not
+        change since the current snapshot was loaded. Nothing happens either
+        when no snapshot is loaded, e.g. after unload(): the next access to
+        current reads the files anyway.
+
+        Returns:
+            bool: Whether a new snapshot was published.
+        """
+        with self._update_lock:
+            if self._current is None:
+                return False
+            if not force and self._current is not None and not self._current.sources_changed():
+                return False
+            start = time.perf_counter()
+            snapshot = self._factory().warm_up(include_ml=self.include_ml)
+            # Batches appended to the old snapshot are superseded by the files on disk
+            self._incremental = None
+            self.publish(snapshot)
+        logger.info(f"Reloaded data in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def append_ratings(self, batch):
+        """
+        Publishes a snapshot with a batch of new ratings (movieId, rating, timestamp, ...).
+
+        The rating aggregates, the average_rating and rating_count of movies
+        and the genre trends are updated incrementally (see
+        incremental.IncrementalRatings), and so are the rating histograms,
+        the catalog and the title search ranking. The other rating-derived
+        artifacts are rebuilt here, before the snapshot is published, so no
+        request waits for them; only the base figures are rebuilt on first
+        use. The raw ratings table and the ratings index keep showing the
+        ratings on disk until the next reload.
+
+        Returns:
+            DataContext: The published snapshot.
+        """
+        with self._update_lock:
+            base = self.current
+            if self._incremental is None:
+                self._incremental = IncrementalRatings(base.movies, base.rating_aggregates)
+            rows = self._incremental.append(batch)
+            movies, aggregates = self._incremental.movies, self._incremental.aggregates
+
+            histograms = base.rating_histograms.with_rows(
+                rows, aggregates.histogram[aggregates.positions(movies["movieId"].to_numpy()[rows])]
+            )
+            rating_counts = histograms.rating_count()
+            snapshot = base.derive(
+                {"movies": movies, "genre": _cast_like(self._incremental.genre_trends(), base.genre_trends)},
+                rating_aggregates=aggregates,
+                rating_histograms=histograms,
+                catalog=base.catalog.with_ratings(histograms.average_rating(), rating_counts),
+                title_search=base.title_search.with_popularity(rating_counts),
+            )
+            snapshot.chart_aggregates
+            snapshot.top_rated_index
+            self.publish(snapshot)
+        return snapshot
+
+    def start_watching(self, interval=DEFAULT_RELOAD_INTERVAL):
+        """
+        Checks the source files every interval seconds on a background
+        thread and reloads when they change.
+        """
+        # Every watcher has its own stop event, so one that was signalled
+        # but has not noticed yet never picks up a later start
+        stop = threading.Event()
+
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception:
+                    logger.exception("Reloading data failed, keeping the current snapshot")
+
+        if self._watcher is None:
+            self._stop = stop
+            self._watcher = threading.Thread(target=watch, name="data-reload", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self, wait=True):
+        """
+        Stops the watcher thread; with wait=False it is only signalled and
+        exits by itself when it next wakes up.
+        """
+        if self._watcher is not None:
+            self._stop.set()
+            if wait:
+                self._watcher.join()
+            self._watcher = None
+
+
+def _cast_like(frame, reference):
+    # Column types of reference; categoricals gain the categories only frame has
+    dtypes = {}
+    for column, dtype in reference.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories.append(pd.Index(frame[column].dropna().unique())).unique()
+            dtype = pd.CategoricalDtype(categories, ordered=dtype.ordered)
+        dtypes[column] = dtype
+    return frame.astype(dtypes)
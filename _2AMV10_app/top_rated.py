@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of filters whose cumulative match counts are kept
+_CACHED_FILTERS = 32
+
+# Columns the pager can sort by
+SORT_COLUMNS = ["average_rating", "rating_count", "title", "movieId"]
+
+
+class SortOrder:
+    """
+    Movies ordered by one column, ties broken by movieId (ascending).
+
+    Values are mapped to float keys that increase along the order (negated
+    for a descending order, ranks for strings), so a keyset cursor, the
+    (value, movieId) of a row, is found by two binary searches.
+    """
+
+    def __init__(self, values, movie_ids, descending):
+        self.descending = descending
+        self._uniques = None
+        if not np.issubdtype(values.dtype, np.number):
+            # Strings sort by their rank among the distinct values
+            self._uniques, ranks = np.unique(values.astype(str), return_inverse=True)
+            keys = ranks.astype(np.float64)
+        else:
+            keys = values.astype(np.float64)
+        if descending:
+            keys = -keys
+        self.order = np.lexsort((movie_ids, keys))
+        self.keys = keys[self.order]
+        self.movie_ids = movie_ids[self.order]
+
+    @property
+    def nbytes(self):
+        uniques = self._uniques.nbytes if self._uniques is not None else 0
+        return int(self.order.nbytes + self.keys.nbytes + self.movie_ids.nbytes + uniques)
+
+    def key(self, value):
+        """
+        Key of a column value, also for values no movie has.
+        """
+        if self._uniques is not None:
+            pos = int(np.searchsorted(self._uniques, str(value)))
+            exact = pos < len(self._uniques) and self._uniques[pos] == str(value)
+            key = pos if exact else pos - 0.5
+        else:
+            key = float(value)
+        return -key if self.descending else key
+
+    def seek(self, cursor, inclusive=False):
+        """
+        Position of the first movie after cursor, or at cursor when inclusive.
+
+        Args:
+            cursor (tuple): (value, movieId) of a row.
+        """
+        value, movie_id = cursor
+        key = self.key(value)
+        lo = int(np.searchsorted(self.keys, key, side="left"))
+        hi = int(np.searchsorted(self.keys, key, side="right"))
+        side = "left" if inclusive else "right"
+        return lo + int(np.searchsorted(self.movie_ids[lo:hi], movie_id, side=side))
+
+    def range(self, low, high):
+        """
+        Positions start:end of the movies with values within [low, high].
+        """
+        low_key, high_key = self.key(low), self.key(high)
+        if self.descending:
+            low_key, high_key = high_key, low_key
+        start = int(np.searchsorted(self.keys, low_key, side="left"))
+        end = int(np.searchsorted(self.keys, high_key, side="right"))
+        return start, max(start, end)
+
+
+class TopRatedIndex:
+    """
+    Movies pre-sorted for the top-rated pager.
+
+    By default movies are ordered by average_rating (highest first) with
+    movieId as tie-break, so a rating range is a contiguous slice found by
+    binary search. For every filter the running number of matching movies
+    along the order is computed once and cached; the size of a filter and
+    the movies on any page, by offset or by keyset cursor, are then binary
+    searches in it, without filtering or sorting the movies again. Other
+    sort orders (see SORT_COLUMNS) are built on first use. Movies without
+    ratings have a NaN average_rating, which sorts last and lies in no
+    rating range, so they never match.
+    """
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns (dict[str, ndarray]): The SORT_COLUMNS of every movie, in
+                the row order of the movies frame.
+        """
+        self.columns = columns
+        self.averages = columns["average_rating"].astype(np.float64)
+        self.counts = columns["rating_count"]
+        # Distinct rating counts; every threshold acts like the smallest one at or above it
+        self._thresholds = np.unique(self.counts)
+        self._orders = {}
+        self._cumulative = {}
+        self._lock = threading.Lock()
+        self.order("average_rating", True)
+
+    @classmethod
+    def from_movies(cls, movies):
+        """
+        Builds the index from movies with movieId, title, average_rating and rating_count.
+        """
+        start = time.perf_counter()
+        index = cls({name: movies[name].to_numpy() for name in SORT_COLUMNS})
+        logger.debug(f"Built top-rated index of {len(movies)} movies in {time.perf_counter() - start:.4f}s")
+        return index
+
+    @property
+    def nbytes(self):
+        arrays = [self.averages, self._thresholds, *self.columns.values(), *list(self._cumulative.values())]
+        orders = sum(order.nbytes for order in list(self._orders.values()))
+        return int(sum(a.nbytes for a in arrays) + orders)
+
+    def order(self, sort_by="average_rating", descending=True):
+        """
+        Returns the SortOrder of a column, building it on first use.
+        """
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort_by!r}, expected one of {SORT_COLUMNS}")
+        key = (sort_by, bool(descending))
+        if key not in self._orders:
+            order = SortOrder(self.columns[sort_by], self.columns["movieId"], bool(descending))
+            with self._lock:
+                self._orders.setdefault(key, order)
+        return self._orders[key]
+
+    def _threshold(self, min_ratings):
+        pos = np.searchsorted(self._thresholds, min_ratings or 0)
+        return self._thresholds[pos] if pos < len(self._thresholds) else np.inf
+
+    def _matches(self, sort_by, descending, min_ratings, rating_range):
+        """
+        Running number of matching movies along an order, and the slice
+        start:end of the order the matches lie in.
+
+        Element i of the running count counts the matches among the first i
+        movies of the order.
+        """
+        order = self.order(sort_by, descending)
+        threshold = self._threshold(min_ratings)
+        low, high = (float(value) for value in rating_range)
+        if sort_by == "average_rating":
+            # The rating range is a slice of this order, only the threshold is counted
+            key = (sort_by, descending, threshold)
+            start, end = order.range(low, high)
+        else:
+            key = (sort_by, descending, threshold, low, high)
+            start, end = 0, len(order.order)
+        cumulative = self._cumulative.get(key)
+        if cumulative is None:
+            match = self.counts[order.order] >= threshold
+            if sort_by != "average_rating":
+                averages = self.averages[order.order]
+                match &= (averages >= low) & (averages <= high)
+            cumulative = np.zeros(len(match) + 1, dtype=np.int64)
+            np.cumsum(match, out=cumulative[1:])
+            with self._lock:
+                if len(self._cumulative) >= _CACHED_FILTERS:
+                    self._cumulative.pop(next(iter(self._cumulative)))
+                self._cumulative[key] = cumulative
+        return order, cumulative, start, end
+
+    def count(self, min_ratings, rating_range):
+        """
+        Number of movies with at least min_ratings ratings rated within rating_range.
+        """
+        _, cumulative, start, end = self._matches("average_rating", True, min_ratings, rating_range)
+        return int(cumulative[end] - cumulative[start])
+
+    def page(self, min_ratings, rating_range, limit, sort_by="average_rating", descending=True,
+             offset=0, after=None, before=None, at=None):
+        """
+        Row positions in the movies frame of one page of matches.
+
+        The page is given by the rank of its first match (offset), or by a
+        keyset cursor, the (sort value, movieId) of a row: the last row of
+        the previous page (after), the first row of the next page (before)
+        or the first row of the page itself (at). Cursors keep paging stable
+        when movies are added or re-rated.
+
+        Returns:
+            tuple: Row positions of the page and the rank of its first match.
+        """
+        order, cumulative, start, end = self._matches(sort_by, descending, min_ratings, rating_range)
+        lowest, highest = cumulative[start], cumulative[end]
+        if after is not None:
+            first = cumulative[min(max(order.seek(after), start), end)]
+        elif at is not None:
+            first = cumulative[min(max(order.seek(at, inclusive=True), start), end)]
+        elif before is not None:
+            stop = cumulative[min(max(order.seek(before, inclusive=True), start), end)]
+            first = max(stop - limit, lowest)
+        else:
+            first = lowest + max(int(offset), 0)
+        first = min(first, highest)
+        last = min(first + limit, highest)
+        # The k-th match (1-based) is where the running count reaches k
+        ranks = np.arange(first + 1, last + 1)
+        positions = order.order[np.searchsorted(cumulative, ranks, side="left") - 1]
+        return positions, int(first - lowest)
@@ -1,28 +1,20 @@
-from dash import html, dcc, Output, Input, callback
+from dash import html, dcc, Output, Input, State, callback, no_update
 import plotly.graph_objects as go
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfTransformer
-from ..data import get_all_data
+from ..context import get_data_context
 
-def create_genre_tag_analysis():
-    # Load data once - keeping your exact processing logic but adding TF-IDF
-    _, _, _, df_movies, _, df_tags, _ = get_all_data()
-
-    # Your original processing steps
-    movies_df = df_movies[["movieId", "genres"]].copy()
-    movies_df["genres_list"] = movies_df["genres"].str.split("|")
-    movie_genres = movies_df.explode("genres_list").rename(columns={"genres_list": "genre"})[["movieId", "genre"]]
+def _genre_options(genres):
+    return [{'label': genre, 'value': genre} for genre in genres]
 
-    tags_with_genre = df_tags.merge(movie_genres, on="movieId", how="inner")[["movieId", "tag", "genre"]]
-    genre_tag_counts = tags_with_genre.drop_duplicates(subset=["movieId", "tag", "genre"]).groupby(["genre", "tag"])["movieId"].nunique().reset_index(name="count_movies_with_tag")
-    genre_tag_matrix = genre_tag_counts.pivot(index="genre", columns="tag", values="count_movies_with_tag").fillna(0)
+def create_genre_tag_analysis():
+    # Genre x tag counts are built once and shared through the data context
+    genre_tag_matrix = get_data_context().genre_tag_matrix
 
     return html.Div([
         html.Div([
             html.Label("Select Genre:", className="font-semibold"),
             dcc.Dropdown(
                 id='genre-tag-dropdown',
-                options=[{'label': genre, 'value': genre} for genre in genre_tag_matrix.index],
+                options=_genre_options(genre_tag_matrix.index),
                 value=genre_tag_matrix.index[0], 
                 style={"marginBottom": "10px"}
             ),
@@ -31,29 +23,27 @@ def create_genre_tag_analysis():
     ], className='p-4')
 
 @callback(
-    Output('TAG_plot', 'figure'),
-    Input('genre-tag-dropdown', 'value')
+    Output('genre-tag-dropdown', 'options'),
+    Output('genre-tag-dropdown', 'value'),
+    Input('dataset-selector', 'value'),
+    State('genre-tag-dropdown', 'value'),
+    prevent_initial_call=True
 )
-def update_tag_plot(selected_genre):
-    # Reload data (ideally cached for efficiency)
-    _, _, _, df_movies, _, df_tags, _ = get_all_data()
-
-    # Same processing as before
-    movies_df = df_movies[["movieId", "genres"]].copy()
-    movies_df["genres_list"] = movies_df["genres"].str.split("|")
-    movie_genres = movies_df.explode("genres_list").rename(columns={"genres_list": "genre"})[["movieId", "genre"]]
+def update_tag_genres(dataset, selected_genre):
+    # Genres with tags in the selected dataset; keeps the genre if it has any
+    genres = get_data_context(dataset).genre_tag_matrix.index
+    return _genre_options(genres), selected_genre if selected_genre in genres else genres[0]
 
-    tags_with_genre = df_tags.merge(movie_genres, on="movieId", how="inner")[["movieId", "tag", "genre"]]
-    genre_tag_counts = tags_with_genre.drop_duplicates(subset=["movieId", "tag", "genre"]).groupby(["genre", "tag"])["movieId"].nunique().reset_index(name="count_movies_with_tag")
-    genre_tag_matrix = genre_tag_counts.pivot(index="genre", columns="tag", values="count_movies_with_tag").fillna(0)
-
-    tfidf = TfidfTransformer(norm="l2", smooth_idf=True)
-    tfidf_matrix = tfidf.fit_transform(genre_tag_matrix.values)
-    tfidf_df = pd.DataFrame(
-        tfidf_matrix.toarray(),
-        index=genre_tag_matrix.index,    
-        columns=genre_tag_matrix.columns  
-    )
+@callback(
+    Output('TAG_plot', 'figure'),
+    Input('genre-tag-dropdown', 'value'),
+    Input('dataset-selector', 'value')
+)
+def update_tag_plot(selected_genre, dataset):
+    # TF-IDF scores are precomputed, the callback only selects a row
+    tfidf_df = get_data_context(dataset).genre_tag_tfidf
+    if selected_genre not in tfidf_df.index:
+        return no_update
 
     # Get top tags using TF-IDF scores instead of counts
     top_tags_tfidf = tfidf_df.loc[selected_genre].sort_values(ascending=False).head(10)
@@ -1,8 +1,9 @@
 from dash import html, dcc
 import plotly.express as px
 import pandas as pd
+from ..downsample import downsample
 
-def create_genre_trends_chart(genre_df):
+def genre_trends_figure(genre_df):
     # Define genre colors
     genre_colors = {
         "Action": "#FF6B6B",
@@ -27,6 +28,12 @@ def create_genre_trends_chart(genre_df):
     
     # Filter out non-genre entries
     genre_df = genre_df[genre_df['genre'].isin(genre_colors.keys())]
+
+    # Bound the number of points per genre line
+    genre_df = pd.concat([
+        downsample(group.sort_values('year'), 'year', 'avg_rating')
+        for _, group in genre_df.groupby('genre', observed=True)
+    ])
     
     # Create the line chart
     fig = px.line(
@@ -70,12 +77,18 @@ def create_genre_trends_chart(genre_df):
             ])
         )
     )
-    
+    return fig
+
+
+def create_genre_trends_chart(figure):
+    # figure is the genre_trends_figure() of the current data, see movie_layout
     return html.Div([
         html.H2(),
         dcc.Graph(
             id='genre-trends-chart',
-            figure=fig,
+            figure=figure,
             style={'height': '400px'}
-        )
+        ),
+        # Genres of the selected movie, None to show all (see genre_callbacks)
+        dcc.Store(id='selected-genres')
     ]) 
\ No newline at end of file
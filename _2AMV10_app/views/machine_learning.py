@@ -1,12 +1,16 @@
-from dash import html, dcc, Output, Input, callback
+from dash import html, dcc, Output, Input, State, callback
 import plotly.graph_objects as go
 import itertools
 import calendar
-from ..ML_data import load_ml_data, predict_best_release_month
+from ..ML_data import predict_best_release_month
+from ..context import get_data_context
+
+def _genre_options(ml_data):
+    return [{'label': genre, 'value': genre} for genre in ml_data['genre_options']]
 
 def create_machine_learning_layout():
-    # Load ML data
-    ml_data = load_ml_data()
+    # Trained once and shared through the data context
+    ml_data = get_data_context().ml_data
     budgets = list(range(10_000_000, 110_000_000, 10_000_000))
 
     return html.Div([
@@ -15,7 +19,7 @@ def create_machine_learning_layout():
             html.Label("Select Genre:", className="font-semibold"),
             dcc.Dropdown(
                 id='genre-dropdown',
-                options=[{'label': genre, 'value': genre} for genre in ml_data['genre_options']],
+                options=_genre_options(ml_data),
                 value=ml_data['genre_options'][0]
             ),
             html.Label("Select Budget:", className="font-semibold mt-4"),
@@ -33,13 +37,33 @@ def create_machine_learning_layout():
         ], className='bg-gray-800 p-4 rounded-lg')
     ], className='p-4')
 
+@callback(
+    Output('genre-dropdown', 'options'),
+    Output('genre-dropdown', 'value'),
+    Input('dataset-selector', 'value'),
+    State('genre-dropdown', 'value'),
+    prevent_initial_call=True
+)
+def update_ml_genres(dataset, selected_genre):
+    # The model is trained per dataset, on its movies_metadata.csv
+    ctx = get_data_context(dataset)
+    if not ctx.has_ml_metadata:
+        return [], None
+    ml_data = ctx.ml_data
+    genres = ml_data['genre_options']
+    return _genre_options(ml_data), selected_genre if selected_genre in genres else genres[0]
+
 @callback(
     Output('ML_plot', 'figure'),
     Input('genre-dropdown', 'value'),
-    Input('budget-slider', 'value')
+    Input('budget-slider', 'value'),
+    Input('dataset-selector', 'value')
 )
-def update_plot(selected_genre, selected_budget):
-    ml_data = load_ml_data()
+def update_plot(selected_genre, selected_budget, dataset):
+    ctx = get_data_context(dataset)
+    if not ctx.has_ml_metadata:
+        return go.Figure(layout=dict(title="No revenue data for this dataset", height=300, template="plotly_white"))
+    ml_data = ctx.ml_data
     best_month, revenues = predict_best_release_month(
         ml_data['model'], ml_data['genre_columns'], [selected_genre], selected_budget
     )
@@ -1,11 +1,18 @@
 from dash import html, dcc
 from .scatter_plot import create_genre_ratings_chart
-from .genre_trends import create_genre_trends_chart
+from .genre_trends import create_genre_trends_chart, genre_trends_figure
 from .top_rated_movies import create_top_rated_movies_chart
 from .machine_learning import create_machine_learning_layout
 from .genre_tag_analysis import create_genre_tag_analysis
+from ..context import get_data_context, get_dataset_registry
+from ..datasets import DEFAULT_DATASET
+from ..poster_images import POSTER_POLL_INTERVAL_MS
 
-def create_movie_layout(movies, ratings, genre):
+def create_movie_layout(clientside_search=False):
+    # Called on every page load (app.layout is a function), so figures come
+    # from the current snapshot's cache instead of being rebuilt
+    ctx = get_data_context()
+    genre_trends = ctx.figures.get('genre_trends', ctx.genre_trends, genre_trends_figure)
     return html.Div(
         id="app-container",
         style={"height": "100vh", "display": "flex", "flexDirection": "row"},
@@ -16,6 +23,14 @@ def create_movie_layout(movies, ratings, genre):
                 className="three columns",
                 style={"height": "100vh", "overflowY": "auto"},
                 children=[
+                    # Dataset the whole dashboard shows; loaded on first selection
+                    dcc.Dropdown(
+                        id="dataset-selector",
+                        options=[{"label": name, "value": name} for name in get_dataset_registry().names],
+                        value=DEFAULT_DATASET,
+                        clearable=False,
+                        style={"width": "100%", "marginBottom": "10px"},
+                    ),
                     dcc.Dropdown(
                         id="movie-dropdown",
                         options=[],
@@ -23,9 +38,18 @@ def create_movie_layout(movies, ratings, genre):
                         style={"width": "100%", "marginBottom": "10px"},
                         searchable=True,
                     ),
+                    # Titles filtered in the browser in client-side search mode
+                    *([dcc.Store(id="title-index")] if clientside_search else []),
+                    # Detail panel; the poster is filled in separately once it is downloaded
                     html.Div(
                         id="movie-poster-container",
                         style={"textAlign": "center", "marginTop": "10px", "maxWidth": "100%"},
+                        children=[
+                            html.Div(id="movie-title"),
+                            html.Div(id="movie-poster"),
+                            html.Div(id="movie-details"),
+                            dcc.Interval(id="poster-poll", interval=POSTER_POLL_INTERVAL_MS, disabled=True),
+                        ]
                     ),
                 ]
             ),
@@ -44,15 +68,15 @@ def create_movie_layout(movies, ratings, genre):
                                 label="Movie Analytics Dashboard",
                                 value="overview",
                                 children=[
-                                    create_genre_ratings_chart(movies, ratings),
-                                    create_genre_trends_chart(genre)
+                                    create_genre_ratings_chart(),
+                                    create_genre_trends_chart(genre_trends)
                                 ]
                             ),
                             dcc.Tab(
                                 label="General Insights",
                                 value="insights",
                                 children=[
-                                    create_top_rated_movies_chart(movies)
+                                    create_top_rated_movies_chart()
                                 ]
                             ),
                             dcc.Tab(
@@ -1,41 +1,25 @@
-from dash import html, dcc
-import plotly.express as px
-import pandas as pd
+from dash import html, dcc, dash_table
+from ..top_rated import SORT_COLUMNS
 
-def create_top_rated_movies_chart(movies):
-    # Sort movies by average rating and get top 10
-    top_movies = movies.sort_values('average_rating', ascending=False).head(10)
-    
-    # Create a list of movie items (dummy for initial render)
-    movie_list = []
-    for i, (_, movie) in enumerate(top_movies.iterrows()):
-        # Format genres as [Action, Comedy]
-        genres = movie['genres']
-        if isinstance(genres, (list, tuple)):
-            genres_str = f"[{', '.join(genres)}]"
-        elif isinstance(genres, str):
-            genres_str = f"[{', '.join(eval(genres) if genres.startswith('[') else genres.split('|'))}]"
-        else:
-            genres_str = "[]"
-        movie_list.append(
-            html.Div([
-                html.Div([
-                    html.Div(f"{i+1}.", style={"width": "40px", "fontWeight": "bold", "color": "#2c8cff", "textAlign": "right"}),
-                    html.Div(movie['title'], style={"flex": "2", "fontWeight": "bold", "paddingLeft": "10px"}),
-                    html.Div(genres_str, style={"flex": "2", "color": "#666", "paddingLeft": "10px"}),
-                    html.Div([
-                        html.Span(f"⭐ {movie['average_rating']:.2f}", style={"color": "#FFD700", "marginRight": "10px"}),
-                        html.Span(f"👥 {movie['rating_count']}", style={"color": "#666"})
-                    ], style={"width": "120px", "textAlign": "right"})
-                ], style={
-                    "display": "flex",
-                    "alignItems": "center",
-                    "padding": "10px 0",
-                    "borderBottom": "1px solid #eee"
-                })
-            ])
-        )
-    
+# Columns of the top-rated table; the ids double as sort keys (see top_rated.SORT_COLUMNS)
+TOP_RATED_COLUMNS = [
+    {"name": "#", "id": "rank"},
+    {"name": "Title", "id": "title"},
+    {"name": "Genres", "id": "genres"},
+    {"name": "⭐ Rating", "id": "average_rating", "type": "numeric", "format": {"specifier": ".2f"}},
+    {"name": "👥 Users", "id": "rating_count", "type": "numeric"},
+]
+
+# DataTable has no per-column sort_action, so the sort arrows of the
+# columns the pager cannot sort by are hidden
+UNSORTABLE_COLUMNS_CSS = [
+    {"selector": f'th[data-dash-column="{column["id"]}"] .column-header--sort', "rule": "display: none"}
+    for column in TOP_RATED_COLUMNS
+    if column["id"] not in SORT_COLUMNS
+]
+
+
+def create_top_rated_movies_chart():
     return html.Div([
         html.H4("Top Rated Movies", style={"marginBottom": "10px", "fontWeight": "bold", "placement": "center"}),
         
@@ -72,12 +56,17 @@ def create_top_rated_movies_chart(movies):
                 )
             ], style={"marginBottom": "15px"}),
             
-            # Pagination controls
+            # Rows fetched per page
             html.Div([
-                html.Button('Previous Page', id='prev-page-btn', n_clicks=0, style={"marginRight": "10px"}),
-                html.Span(id='page-indicator', style={"fontWeight": "bold", "marginRight": "10px"}),
-                html.Button('Next Page', id='next-page-btn', n_clicks=0)
-            ], style={"marginBottom": "0px", "marginTop": "10px"})
+                html.Label("Movies per page:", style={"marginRight": "10px"}),
+                dcc.Dropdown(
+                    id='page-size-dropdown',
+                    options=[10, 50, 250, 1000],
+                    value=10,
+                    clearable=False,
+                    style={"width": "100px"}
+                )
+            ], style={"display": "flex", "alignItems": "center", "marginTop": "10px"})
         ], style={
             "backgroundColor": "white",
             "padding": "15px",
@@ -86,9 +75,10 @@ def create_top_rated_movies_chart(movies):
             "boxShadow": "0 2px 4px rgba(0,0,0,0.1)"
         }),
         
-        # Movies list
+        html.Div(id='top-rated-message', style={"textAlign": "center", "color": "#666"}),
+
+        # Movies table; pages are fetched from the server and only the visible rows are rendered
         html.Div(
-            id='top-rated-movies-list',
             style={
                 "backgroundColor": "white",
                 "borderRadius": "1rem",
@@ -96,6 +86,34 @@ def create_top_rated_movies_chart(movies):
                 "marginTop": "10px",
                 "boxShadow": "0 2px 4px rgba(0,0,0,0.1)"
             },
-            children=movie_list
-        )
-    ]) 
\ No newline at end of file
+            children=dash_table.DataTable(
+                id='top-rated-table',
+                columns=TOP_RATED_COLUMNS,
+                data=[],
+                page_action='custom',
+                page_current=0,
+                page_size=10,
+                page_count=1,
+                sort_action='custom',
+                sort_mode='single',
+                sort_by=[],
+                css=UNSORTABLE_COLUMNS_CSS,
+                virtualization=True,
+                fixed_rows={'headers': True},
+                style_table={"maxHeight": "500px", "overflowY": "auto"},
+                style_cell={"textAlign": "left", "padding": "0 10px", "height": "48px", "border": "none",
+                            "borderBottom": "1px solid #eee"},
+                style_cell_conditional=[
+                    {"if": {"column_id": "rank"}, "width": "40px", "textAlign": "right", "color": "#2c8cff", "fontWeight": "bold"},
+                    {"if": {"column_id": "title"}, "fontWeight": "bold"},
+                    {"if": {"column_id": "genres"}, "color": "#666"},
+                    {"if": {"column_id": ["average_rating", "rating_count"]}, "width": "90px", "textAlign": "right",
+                     "fontFamily": "monospace"},
+                ],
+                style_header={"fontWeight": "bold", "background": "#f7f7f7", "borderBottom": "2px solid #bbb"},
+            )
+        ),
+
+        # Page state of this browser session: the query and the keyset cursors of the page shown
+        dcc.Store(id='top-rated-page-state', storage_type='session')
+    ])
@@ -1,11 +1,15 @@
 from _2AMV10_app.main import app
-from _2AMV10_app.data import get_all_data
+from _2AMV10_app.context import get_dataset_registry
+from _2AMV10_app.prefetch import get_poster_prefetcher
 from _2AMV10_app.views.movie_layout import create_movie_layout
 from _2AMV10_app.callbacks.movie_callbacks import register_movie_callbacks
 from _2AMV10_app.callbacks.chart_callbacks import register_chart_callbacks
 from _2AMV10_app.callbacks.genre_callbacks import register_genre_callbacks
 from _2AMV10_app.callbacks.top_rated_callbacks import register_top_rated_callbacks
+from _2AMV10_app.poster_images import register_poster_routes
 import logging
+import os
+from dotenv import load_dotenv
 
 # Set up logging
 logging.basicConfig(
@@ -14,18 +18,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Load environment variables (OMDB_API_KEY, CLIENTSIDE_SEARCH, ...) from .env file
+load_dotenv()
+
+# Filter the movie search in the browser instead of on the server
+CLIENTSIDE_SEARCH = os.getenv("CLIENTSIDE_SEARCH", "0") == "1"
+
 if __name__ == '__main__':
-    # Load the movies DataFrame
-    _, _, _, movies, ratings, _, genre = get_all_data()
+    # Load the default dataset once; views and callbacks share it through the
+    # data context, other datasets load when they are first selected
+    registry = get_dataset_registry()
+    ctx = registry.store().current.warm_up()
+    logger.info(f"Data context ready:\n{ctx.report()}")
+    logger.info(f"Datasets: {', '.join(registry.names)}")
+
+    # Fetch the posters of the most-rated movies in the background
+    get_poster_prefetcher().warm_most_rated(ctx.catalog)
+
+    # Publish a new data snapshot whenever the CSV files of a loaded dataset change
+    registry.start_watching()
     
-    # Set up the layout
-    app.layout = create_movie_layout(movies, ratings, genre)
+    # Set up the layout; built on every page load so the views start from
+    # the current snapshot after a reload
+    app.layout = lambda: create_movie_layout(clientside_search=CLIENTSIDE_SEARCH)
     
     # Register callbacks
-    register_movie_callbacks(app, movies, ratings)
-    register_chart_callbacks(app, movies, ratings)
-    register_genre_callbacks(app, movies)
-    register_top_rated_callbacks(app, movies)
+    register_movie_callbacks(app, clientside_search=CLIENTSIDE_SEARCH)
+    register_chart_callbacks(app)
+    register_genre_callbacks(app)
+    register_top_rated_callbacks(app)
+
+    # Serve poster thumbnails from the app's own server
+    register_poster_routes(app)
     
     # Run the app
     app.run(debug=True, dev_tools_ui=True)